@@ -93,6 +93,20 @@ def create_app(config_name='default'):
     app.register_blueprint(admin.bp)
     app.register_blueprint(notifications_bp)
 
+    # Opt-in per-request SQL profiling
+    from app import profiling
+    profiling.init_app(app)
+
+    # Replay job/subscriber changes made by other workers into local caches
+    from app import cache_bus
+    cache_bus.init_app(app)
+
+    # CLI commands
+    from app.cli import notifications_cli, subscriptions_cli, jobs_cli
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(subscriptions_cli)
+    app.cli.add_command(jobs_cli)
+
     # Logging setup
     if not app.debug:
         if not os.path.exists('logs'):
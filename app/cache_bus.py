@@ -0,0 +1,176 @@
+"""Cross-process cache invalidation.
+
+Listing counts, reference data, the suggest index and in-memory rendered
+pages are cached per process and dropped by the jobs_changed and
+subscribers_changed signals, which only reach the process that made the
+write. So writes also mark what they change (sync_listing and the
+subscriber counters call mark_changed), and on commit, in the same
+transaction, the topic's row in `cache_versions` is bumped and the changed
+job ids are logged under the new version. The row lock orders concurrent
+writers, so versions commit in sequence. Before a request, each process
+reads the versions, at most once per CACHE_VERSION_CHECK_INTERVAL, and
+replays what it missed through the same signals with remote=True.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, delete
+import json
+import logging
+import threading
+import time
+from app import db
+from app.db_utils import upsert
+from app.models import CacheVersion, CacheChange
+from app.signals import jobs_changed, subscribers_changed
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = {'jobs': jobs_changed, 'subscribers': subscribers_changed}
+# Larger changes are logged as "everything changed"
+MAX_LOGGED_IDS = 1000
+# Change log kept per topic; a process further behind drops everything
+KEEP_VERSIONS = 500
+
+_install_lock = threading.Lock()
+_installed = []
+
+
+def mark_changed(topic, job_ids=None):
+    """Record that the session's transaction changes topic (job_ids=None: all of it)"""
+    changes = db.session.info.setdefault('cache_changes', {})
+    if job_ids is None or (topic in changes and changes[topic] is None):
+        changes[topic] = None
+    else:
+        changes.setdefault(topic, set()).update(job_ids)
+
+
+def _bump(session, topic, job_ids):
+    """Increment topic's version and log its job ids; returns the new version"""
+    version = session.execute(upsert(CacheVersion.__table__, session).values(name=topic, version=1).on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': CacheVersion.__table__.c.version + 1}
+    ).returning(CacheVersion.__table__.c.version)).scalar_one()
+
+    logged = sorted(job_ids) if job_ids is not None and len(job_ids) <= MAX_LOGGED_IDS else None
+    session.execute(insert(CacheChange.__table__).values(
+        name=topic, version=version, job_ids_json=json.dumps(logged) if logged is not None else None
+    ))
+    session.execute(delete(CacheChange.__table__).where(
+        CacheChange.__table__.c.name == topic,
+        CacheChange.__table__.c.version <= version - KEEP_VERSIONS
+    ))
+    return version
+
+
+def _before_commit(session):
+    changes = session.info.pop('cache_changes', None)
+    if changes:
+        session.info['cache_bumped'] = {topic: _bump(session, topic, ids) for topic, ids in changes.items()}
+
+
+def _after_commit(session):
+    bumped = session.info.pop('cache_bumped', None)
+    if not bumped or not has_app_context():
+        return
+    # This process signals its own writes; don't replay them unless others were missed too
+    state = _state(current_app._get_current_object())
+    with state.lock:
+        if state.versions is not None:
+            for topic, version in bumped.items():
+                if state.versions.get(topic, 0) == version - 1:
+                    state.versions[topic] = version
+
+
+def _after_soft_rollback(session, previous_transaction):
+    # Savepoints rolling back leave the outer transaction's marks alone
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('cache_changes', None)
+    session.info.pop('cache_bumped', None)
+
+
+def install():
+    """Attach the commit hooks to the app's sessions, once per process"""
+    with _install_lock:
+        if not _installed:
+            event.listen(db.session, 'before_commit', _before_commit)
+            event.listen(db.session, 'after_commit', _after_commit)
+            event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
+            _installed.append(True)
+
+
+class VersionState:
+    """Versions this process has caught up with, and when to look again"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.versions = None
+        self.next_check = 0.0
+
+
+def _state(app):
+    state = app.extensions.get('cache_versions')
+    if state is None:
+        state = app.extensions['cache_versions'] = VersionState(app.config.get('CACHE_VERSION_CHECK_INTERVAL', 1.0))
+    return state
+
+
+def _missed_job_ids(topic, seen, version):
+    """Job ids changed after version seen, or None if the log can't tell"""
+    if version < seen:
+        return None
+    rows = db.session.query(CacheChange.job_ids_json).filter(
+        CacheChange.name == topic, CacheChange.version > seen, CacheChange.version <= version
+    ).all()
+    if len(rows) < version - seen:
+        return None
+    job_ids = set()
+    for (raw,) in rows:
+        if raw is None:
+            return None
+        job_ids.update(json.loads(raw))
+    return sorted(job_ids)
+
+
+def check_versions(app):
+    """Replay, through the local signals, changes committed by other processes"""
+    state = _state(app)
+    now = time.monotonic()
+    if now < state.next_check:
+        return
+    state.next_check = now + state.interval
+
+    current = dict(db.session.query(CacheVersion.name, CacheVersion.version).all())
+    with state.lock:
+        if state.versions is None:
+            # Nothing is cached from before the first check
+            state.versions = current
+            return
+        missed = {topic: (state.versions.get(topic, 0), version)
+                  for topic, version in current.items() if version != state.versions.get(topic, 0)}
+        state.versions.update(current)
+
+    for topic, (seen, version) in missed.items():
+        signal = SIGNALS.get(topic)
+        if signal is None:
+            continue
+        if topic == 'jobs':
+            signal.send(app, job_ids=_missed_job_ids(topic, seen, version), remote=True)
+        else:
+            signal.send(app, remote=True)
+        logger.info(f"Replayed {topic} changes {seen + 1}-{version} from other processes")
+
+
+def init_app(app):
+    """Bump versions on commit; check them before requests unless the interval is negative"""
+    install()
+    if app.config.get('CACHE_VERSION_CHECK_INTERVAL', 1.0) < 0:
+        return
+
+    @app.before_request
+    def replay_remote_changes():
+        try:
+            check_versions(app)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Cache version check failed: {e}")
@@ -0,0 +1,151 @@
+"""Flask CLI commands (`flask <group> <command>`)"""
+import click
+import logging
+from flask import current_app
+from flask.cli import AppGroup
+
+notifications_cli = AppGroup('notifications', help='Push notification queue commands.')
+subscriptions_cli = AppGroup('subscriptions', help='Push subscription maintenance commands.')
+jobs_cli = AppGroup('jobs', help='Job listing maintenance commands.')
+
+
+@notifications_cli.command('worker')
+@click.option('--batch-size', type=int, default=None, help='Subscribers delivered per progress checkpoint.')
+@click.option('--poll-interval', type=float, default=None, help='Seconds to sleep when the queue is empty.')
+@click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+def notifications_worker(batch_size, poll_interval, once):
+    """Claim queued notifications and deliver them."""
+    from app.utils.notification_queue import run_worker
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    config = current_app.config
+    if not run_worker(
+        batch_size=batch_size or config['NOTIFICATION_BATCH_SIZE'],
+        poll_interval=poll_interval or config['NOTIFICATION_POLL_INTERVAL'],
+        lease_seconds=config['NOTIFICATION_LEASE_SECONDS'],
+        max_attempts=config['NOTIFICATION_MAX_ATTEMPTS'],
+        once=once
+    ):
+        raise SystemExit(1)
+
+
+@subscriptions_cli.command('prune')
+@click.option('--chunk-size', type=int, default=1000, show_default=True, help='Rows deleted per transaction.')
+@click.option('--vacuum', is_flag=True, help='Compact the table and refresh planner stats afterwards.')
+def subscriptions_prune(chunk_size, vacuum):
+    """Delete inactive and expired push subscriptions."""
+    from app.utils.push_notifications import prune_inactive_subscriptions
+
+    deleted = prune_inactive_subscriptions(chunk_size=chunk_size, vacuum=vacuum)
+    click.echo(f"Pruned {deleted} inactive subscriptions.")
+
+
+@subscriptions_cli.command('recount')
+def subscriptions_recount():
+    """Rebuild the per-batch active subscriber counters."""
+    from app.utils.push_notifications import recount_subscribers
+
+    counts = recount_subscribers()
+    click.echo(f"Counted {sum(counts.values())} active subscribers in {len(counts)} batches.")
+
+
+@jobs_cli.command('explain')
+@click.option('--verbose', '-v', is_flag=True, help='Print every plan, not just regressions.')
+def jobs_explain(verbose):
+    """Check that every listing query shape is served by an index."""
+    from app.query_plans import check_listing_plans
+
+    failed = 0
+    for name, lines, problems in check_listing_plans():
+        if problems:
+            failed += 1
+        if problems or verbose:
+            click.echo(f"{'FAIL: ' + '; '.join(problems) if problems else 'ok'}  {name}")
+            for line in lines:
+                click.echo(f"    {line}")
+
+    if failed:
+        click.echo(f"{failed} listing queries are not served by their index.", err=True)
+        raise SystemExit(1)
+    click.echo("All listing queries use an index.")
+
+
+@jobs_cli.command('rebuild-listing')
+def jobs_rebuild_listing():
+    """Regenerate the job_listing read model from the job table."""
+    from app import db
+    from app.listing import rebuild_listing
+    from app.signals import jobs_changed
+
+    listed = rebuild_listing()
+    db.session.commit()
+    jobs_changed.send(current_app._get_current_object(), job_ids=[])
+    click.echo(f"Listed {listed} active jobs.")
+
+
+@jobs_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson', 'json']), default=None,
+              help='File format; guessed from the extension by default.')
+@click.option('--chunk-size', type=int, default=None, help='Rows validated and inserted per transaction.')
+@click.option('--no-notify', is_flag=True, help="Don't queue a new-jobs notification.")
+def jobs_import(path, file_format, chunk_size, no_notify):
+    """Import jobs from a CSV, NDJSON or JSON array file."""
+    from app.job_import import import_jobs, detect_format, ImportFormatError
+
+    file_format = file_format or detect_format(path)
+    if not file_format:
+        raise click.UsageError("Can't tell the format from the file name; pass --format.")
+
+    with open(path, 'rb') as f:
+        try:
+            result = import_jobs(f, file_format,
+                                 chunk_size=chunk_size or current_app.config['JOB_IMPORT_CHUNK_SIZE'],
+                                 notify=not no_notify)
+        except ImportFormatError as e:
+            click.echo(f"Import stopped: {e}", err=True)
+            raise SystemExit(1)
+
+    for row, message in result.errors:
+        click.echo(f"row {row}: {message}", err=True)
+    if result.rejected > len(result.errors):
+        click.echo(f"... {result.rejected - len(result.errors)} more rejected rows", err=True)
+    click.echo(f"Imported {result.imported} jobs, rejected {result.rejected} rows.")
+
+
+@jobs_cli.command('sweep')
+@click.option('--retention-days', type=int, default=None,
+              help='Archive inactive or expired jobs created more than this many days ago (0 keeps all).')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Jobs changed per transaction.')
+@click.option('--dry-run', is_flag=True, help='Only report how many jobs would change.')
+def jobs_sweep(retention_days, chunk_size, dry_run):
+    """Deactivate jobs past their deadline and archive old inactive ones."""
+    from app.job_archive import sweep, pending_sweep
+
+    if retention_days is None:
+        retention_days = current_app.config['JOB_RETENTION_DAYS']
+
+    if dry_run:
+        expired, archivable = pending_sweep(retention_days)
+        click.echo(f"Would deactivate {expired} expired jobs and archive {archivable}.")
+        return
+
+    deactivated, archived = sweep(retention_days, chunk_size=chunk_size)
+    click.echo(f"Deactivated {deactivated} expired jobs, archived {archived}.")
+
+
+@jobs_cli.command('dedupe')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Postings merged per transaction.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be merged.')
+def jobs_dedupe(chunk_size, dry_run):
+    """Fingerprint jobs posted before duplicate detection and merge the copies."""
+    from app.job_dedupe import plan_dedupe, merge_duplicates
+
+    plan = plan_dedupe()
+    if dry_run:
+        click.echo(f"Would merge {plan.duplicates} duplicates into {len(plan.merges)} jobs "
+                   f"and fingerprint {len(plan.fingerprints)}.")
+        return
+
+    merged = merge_duplicates(plan, chunk_size=chunk_size)
+    click.echo(f"Merged {merged} duplicates into {len(plan.merges)} jobs, fingerprinted {len(plan.fingerprints)}.")
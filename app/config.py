@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -27,6 +28,56 @@ class Config:
         "sub": os.environ.get('VAPID_CLAIM_EMAIL', 'mailto:admin@nextsteps.com')
     }
 
+    # Push fan-out: sends kept in flight at once, and per-request timeout (seconds)
+    PUSH_CONCURRENCY = int(os.environ.get('PUSH_CONCURRENCY', 50))
+    PUSH_TIMEOUT = float(os.environ.get('PUSH_TIMEOUT', 10))
+    # Ceiling per push service host; the live window shrinks on 429/503 and regrows
+    PUSH_HOST_CONCURRENCY = int(os.environ.get('PUSH_HOST_CONCURRENCY', 50))
+    # Attempts after the first for 429/5xx/network failures
+    PUSH_MAX_RETRIES = int(os.environ.get('PUSH_MAX_RETRIES', 3))
+    # Subscribers fetched per keyset page while streaming an audience
+    SUBSCRIBER_CHUNK_SIZE = int(os.environ.get('SUBSCRIBER_CHUNK_SIZE', 1000))
+
+    # Notification outbox worker (`flask notifications worker`)
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 500))
+    NOTIFICATION_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_POLL_INTERVAL', 2))
+    NOTIFICATION_LEASE_SECONDS = int(os.environ.get('NOTIFICATION_LEASE_SECONDS', 300))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 5))
+    # New-job pushes within this many seconds are merged into one digest per batch
+    NOTIFICATION_COALESCE_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 120))
+    # How long push services hold an undelivered notification (seconds)
+    NOTIFICATION_TTL = int(os.environ.get('NOTIFICATION_TTL', 24 * 60 * 60))
+
+    # Rows validated and inserted per transaction by bulk job imports
+    JOB_IMPORT_CHUNK_SIZE = int(os.environ.get('JOB_IMPORT_CHUNK_SIZE', 1000))
+    # `flask jobs sweep` moves inactive/expired jobs older than this many days to job_archive (0 keeps all)
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 180))
+
+    # 'auto' uses FTS5 on SQLite and tsvector on Postgres; 'like' forces ILIKE
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    # Seconds a cached listing total may be served; job writes clear it sooner
+    LISTING_COUNT_TTL = int(os.environ.get('LISTING_COUNT_TTL', 300))
+
+    # Batch list, job type counts and subscriber counts; writes refresh them sooner
+    REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 300))
+
+    # Rendered public pages for anonymous visitors: 'memory', 'filesystem', 'redis' or 'none'
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'memory')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR')
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', os.environ.get('REDIS_URL'))
+
+    # Seconds between each worker's check for cache changes made by other workers (<0 disables)
+    CACHE_VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_INTERVAL', 1))
+
+    # Per-request query count/time in Server-Timing and the log, with N+1 warnings
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '').lower() in ('1', 'true', 'yes')
+    # Flag statements repeated this many times in one request
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    # Max queries per endpoint, e.g. {"main.index": 6}; exceeding one fails under TESTING
+    SQL_QUERY_BUDGETS = json.loads(os.environ.get('SQL_QUERY_BUDGETS', '{}'))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
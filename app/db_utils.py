@@ -0,0 +1,9 @@
+"""Dialect-specific SQL shared by modules writing through the session"""
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+
+def upsert(model, session=None):
+    """INSERT supporting ON CONFLICT for the session's database (Postgres or SQLite)"""
+    dialect = (session or db.session).get_bind().dialect.name
+    return (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(model)
@@ -0,0 +1,103 @@
+"""Expiry sweep: deactivate jobs past their deadline and archive old ones.
+
+`flask jobs sweep`, run from cron or any scheduler, does both in chunks of
+jobs. Each chunk is one transaction that also syncs the listing rows, and
+jobs_changed is sent after it commits, so counts, cached pages and the
+suggest index follow. Inactive or expired jobs created before the
+retention window are copied to `job_archive` with their batch names and
+deleted from `job`, keeping the tables the listing and the dashboard read
+from small; open postings stay whatever their age.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, delete, insert, update
+from sqlalchemy.orm import selectinload
+import logging
+from app import db
+from app.models import Job, JobArchive, job_batches
+from app.listing import sync_listing
+from app.signals import jobs_changed
+
+logger = logging.getLogger(__name__)
+
+# Job columns copied as-is into job_archive
+ARCHIVED_COLUMNS = (
+    'company_name', 'role', 'location', 'description', 'apply_link',
+    'is_internship', 'is_hackathon', 'salary', 'stipend', 'prize_money',
+    'deadline', 'created_at', 'is_active',
+)
+
+
+def expiry_cutoff():
+    """Deadlines are dates, so a job expires once its deadline day is over"""
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _expired():
+    return (Job.is_active == True) & (Job.deadline < expiry_cutoff())
+
+
+def _archivable(retention_days):
+    # Still-open jobs are kept whatever their age: only inactive or expired ones go
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return (Job.created_at < cutoff) & or_(Job.is_active == False, Job.deadline < expiry_cutoff())
+
+
+def deactivate_expired(chunk_size=500):
+    """Mark active jobs whose deadline has passed inactive; returns how many"""
+    app = current_app._get_current_object()
+    total = 0
+    while True:
+        ids = [job_id for (job_id,) in db.session.query(Job.id).filter(_expired()).order_by(Job.id).limit(chunk_size)]
+        if not ids:
+            return total
+        db.session.execute(update(Job).where(Job.id.in_(ids)).values(is_active=False))
+        sync_listing(ids)
+        db.session.commit()
+        jobs_changed.send(app, job_ids=ids)
+        total += len(ids)
+        logger.info(f"Deactivated {len(ids)} expired jobs")
+
+
+def archive_old_jobs(retention_days, chunk_size=500):
+    """Move inactive or expired jobs created more than retention_days ago to job_archive; returns how many"""
+    app = current_app._get_current_object()
+    total = 0
+    while True:
+        jobs = Job.query.options(selectinload(Job.batches)).filter(
+            _archivable(retention_days)
+        ).order_by(Job.id).limit(chunk_size).all()
+        if not jobs:
+            return total
+
+        ids = [job.id for job in jobs]
+        now = datetime.utcnow()
+        db.session.execute(insert(JobArchive), [
+            dict({column: getattr(job, column) for column in ARCHIVED_COLUMNS},
+                 job_id=job.id, batch_names=job.batch_names, archived_at=now)
+            for job in jobs
+        ])
+        db.session.execute(delete(job_batches).where(job_batches.c.job_id.in_(ids)))
+        db.session.execute(delete(Job).where(Job.id.in_(ids)))
+        sync_listing(ids)
+        db.session.commit()
+        db.session.expunge_all()
+        jobs_changed.send(app, job_ids=ids)
+        total += len(ids)
+        logger.info(f"Archived {len(ids)} jobs")
+
+
+def pending_sweep(retention_days):
+    """(expired, archivable) job counts, without changing anything"""
+    expired = db.session.query(db.func.count(Job.id)).filter(_expired()).scalar()
+    archivable = 0
+    if retention_days > 0:
+        archivable = db.session.query(db.func.count(Job.id)).filter(_archivable(retention_days)).scalar()
+    return expired, archivable
+
+
+def sweep(retention_days, chunk_size=500):
+    """Deactivate expired jobs, then archive old ones (retention_days <= 0 keeps all)"""
+    deactivated = deactivate_expired(chunk_size)
+    archived = archive_old_jobs(retention_days, chunk_size) if retention_days > 0 else 0
+    return deactivated, archived
@@ -0,0 +1,110 @@
+"""Duplicate postings: fingerprint lookup and the one-off merge.
+
+Every job write stores Job.fingerprint, and its unique index over active
+jobs makes a duplicate check a single index probe; inactive jobs don't
+count, so a posting that expired can be posted again. Jobs posted before the column
+existed only have it on one copy of each posting; `flask jobs dedupe`
+fingerprints the rest, merging every other copy into the fingerprinted one.
+"""
+from flask import current_app
+from sqlalchemy import select, delete, insert, update
+import logging
+from app import db
+from app.models import Job, job_batches
+from app.listing import sync_listing
+from app.signals import jobs_changed
+
+logger = logging.getLogger(__name__)
+
+
+def find_duplicate(fingerprint, exclude_id=None):
+    """The active job already holding this fingerprint, other than exclude_id"""
+    query = Job.query.filter(Job.fingerprint == fingerprint, Job.is_active == True)
+    if exclude_id is not None:
+        query = query.filter(Job.id != exclude_id)
+    return query.first()
+
+
+class DedupePlan:
+    """Fingerprints to store and copies to merge, worked out from one read of job"""
+
+    def __init__(self):
+        # [(job id, fingerprint)] for jobs that keep their row
+        self.fingerprints = []
+        # {kept job id: [(copy id, copy is_active)]}
+        self.merges = {}
+
+    @property
+    def duplicates(self):
+        return sum(len(copies) for copies in self.merges.values())
+
+
+def plan_dedupe():
+    """
+    Group every job missing a fingerprint with its posting. The job kept is
+    the one already fingerprinted, else the first active one, else the oldest.
+    """
+    plan = DedupePlan()
+    rows = db.session.query(
+        Job.id, Job.company_name, Job.role, Job.apply_link, Job.is_active, Job.fingerprint
+    ).order_by(Job.is_active.desc(), Job.id).all()
+
+    # Inactive jobs may share a fingerprint with an active one, which sorts first
+    kept = {}
+    for row in rows:
+        if row.fingerprint:
+            kept.setdefault(row.fingerprint, row.id)
+    for row in rows:
+        if row.fingerprint:
+            continue
+        fingerprint = Job.content_fingerprint(row.company_name, row.role, row.apply_link)
+        if fingerprint in kept:
+            plan.merges.setdefault(kept[fingerprint], []).append((row.id, bool(row.is_active)))
+        else:
+            kept[fingerprint] = row.id
+            plan.fingerprints.append((row.id, fingerprint))
+    return plan
+
+
+def _merge(merges):
+    """Fold copies into their kept job: batches moved over, active if any copy was"""
+    copy_of = {copy_id: kept_id for kept_id, copies in merges.items() for copy_id, _ in copies}
+    links = db.session.execute(
+        select(job_batches.c.job_id, job_batches.c.batch_id)
+        .where(job_batches.c.job_id.in_(list(copy_of) + list(merges)))
+    ).all()
+    existing = {(job_id, batch_id) for job_id, batch_id in links if job_id in merges}
+    moved = {(copy_of[job_id], batch_id) for job_id, batch_id in links if job_id in copy_of} - existing
+    if moved:
+        db.session.execute(insert(job_batches), [{'job_id': j, 'batch_id': b} for j, b in sorted(moved)])
+
+    activate = [kept_id for kept_id, copies in merges.items() if any(active for _, active in copies)]
+    if activate:
+        db.session.execute(update(Job).where(Job.id.in_(activate)).values(is_active=True))
+
+    db.session.execute(delete(job_batches).where(job_batches.c.job_id.in_(list(copy_of))))
+    db.session.execute(delete(Job).where(Job.id.in_(list(copy_of))))
+    return list(copy_of)
+
+
+def merge_duplicates(plan, chunk_size=500):
+    """Apply a plan in chunks, each one transaction; returns the number of copies merged"""
+    app = current_app._get_current_object()
+    groups = list(plan.merges.items())
+    for start in range(0, len(groups), chunk_size):
+        merges = dict(groups[start:start + chunk_size])
+        removed = _merge(merges)
+        changed = list(merges) + removed
+        sync_listing(changed)
+        db.session.commit()
+        jobs_changed.send(app, job_ids=changed)
+        logger.info(f"Merged {len(removed)} duplicate jobs into {len(merges)}")
+
+    # Postings with no fingerprint yet, so these can't collide with an active job
+    for start in range(0, len(plan.fingerprints), chunk_size):
+        db.session.execute(update(Job), [
+            {'id': job_id, 'fingerprint': value}
+            for job_id, value in plan.fingerprints[start:start + chunk_size]
+        ])
+        db.session.commit()
+    return plan.duplicates
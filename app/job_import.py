@@ -0,0 +1,372 @@
+"""Bulk job import from CSV, NDJSON or JSON files.
+
+Files are parsed as a stream and handled a chunk of rows at a time: the
+chunk is validated in one pass, all of its batch names are resolved with
+one query (missing ones created by an upsert), duplicates of existing jobs
+are dropped by one fingerprint lookup, and its jobs, batch links and
+listing rows are written with a few multi-row INSERTs. The whole import
+then queues a single new-jobs notification.
+
+Columns (CSV header or JSON keys): company_name, role, apply_link,
+location, description, opportunity_type (full_time, internship or
+hackathon), salary, stipend, prize_money, deadline (YYYY-MM-DD) and
+batch_names (comma separated, or a JSON list).
+"""
+from datetime import datetime
+from sqlalchemy import insert, select
+import csv
+import io
+import json
+import logging
+from app import db
+from app.models import Job, Batch, job_batches
+from app.db_utils import upsert
+from app.listing import sync_listing
+from app.validation import validate_url, sanitize_input
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson', 'json')
+CHUNK_SIZE = 1000
+# Errors kept for the report; later ones are only counted
+MAX_ERRORS = 100
+# Longest single JSON object accepted, in characters
+MAX_OBJECT_SIZE = 1024 * 1024
+
+OPPORTUNITY_TYPES = ('full_time', 'internship', 'hackathon')
+# Compensation column and upper bound per type, as in the add/edit form
+COMPENSATION = {
+    'full_time': ('salary', 1000),
+    'internship': ('stipend', 1000000),
+    'hackathon': ('prize_money', 100000000),
+}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole can't be read; nothing after this point is imported"""
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.job_ids = []
+        self.errors = []
+        self.batches = set()
+        self.unbatched = False
+
+    def reject(self, row, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((row, message))
+
+
+def detect_format(filename):
+    """Import format from a file name's extension, or None"""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.json'):
+        return 'json'
+    return None
+
+
+# ==================== STREAMING PARSERS ====================
+# Each yields (row number, record); a line that can't be decoded yields a
+# ValueError as its record, reported as that row's error.
+
+def _csv_records(text):
+    reader = csv.DictReader(text)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _ndjson_records(text):
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"invalid JSON ({e})")
+
+
+def _json_records(text, read_size=64 * 1024):
+    """Items of a top-level JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False
+    number = 0
+
+    while True:
+        buffer = buffer.lstrip()
+        if started and buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if started and buffer.startswith(']'):
+            return
+
+        if buffer:
+            if not started:
+                if not buffer.startswith('['):
+                    raise ImportFormatError("A JSON import must be an array of objects")
+                buffer = buffer[1:]
+                started = True
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except ValueError:
+                end = None
+            # A value running to the end of the buffer may still be cut short
+            if end is not None and (end < len(buffer) or eof):
+                number += 1
+                yield number, record
+                buffer = buffer[end:]
+                continue
+            if eof:
+                raise ImportFormatError(f"Invalid JSON after item {number}")
+            if len(buffer) > MAX_OBJECT_SIZE:
+                raise ImportFormatError(f"Item {number + 1} is invalid or larger than {MAX_OBJECT_SIZE} characters")
+        elif eof:
+            raise ImportFormatError("Unexpected end of JSON")
+
+        data = text.read(read_size)
+        eof = not data
+        buffer += data
+
+
+PARSERS = {
+    'csv': _csv_records,
+    'ndjson': _ndjson_records,
+    'json': _json_records,
+}
+
+
+def read_records(stream, file_format):
+    """(row number, record) pairs from a binary file object, read incrementally"""
+    if file_format not in PARSERS:
+        raise ImportFormatError(f"Unsupported format: {file_format}")
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return PARSERS[file_format](text)
+
+
+# ==================== VALIDATION ====================
+
+def _number(value, field, maximum):
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number")
+    if not 0 <= number <= maximum:
+        raise ValueError(f"{field} must be between 0 and {maximum}")
+    return number
+
+
+def _batch_names(value):
+    if not value:
+        return []
+    names = value if isinstance(value, list) else str(value).split(',')
+    names = [sanitize_input(str(name).strip(), 10) for name in names]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def clean_record(record):
+    """Job column values and batch names for one raw record; ValueError if invalid"""
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    get = lambda field: str(record.get(field) or '').strip()
+
+    opportunity_type = (get('opportunity_type') or get('job_type') or 'full_time').lower().replace(' ', '_').replace('-', '_')
+    if opportunity_type not in OPPORTUNITY_TYPES:
+        raise ValueError(f"unknown opportunity_type '{opportunity_type}'")
+
+    values = {
+        'company_name': sanitize_input(get('company_name'), 200),
+        'role': sanitize_input(get('role'), 200),
+        'apply_link': get('apply_link'),
+        'description': sanitize_input(get('description'), 5000) or '',
+        'location': sanitize_input(get('location'), 200) or '',
+        'is_internship': opportunity_type == 'internship',
+        'is_hackathon': opportunity_type == 'hackathon',
+        'salary': None,
+        'stipend': None,
+        'prize_money': None,
+        'deadline': None,
+    }
+    if not values['company_name'] or not values['role'] or not values['apply_link']:
+        raise ValueError("company_name, role and apply_link are required")
+    if not validate_url(values['apply_link']):
+        raise ValueError("apply_link is not a valid http(s) URL")
+    values['fingerprint'] = Job.content_fingerprint(values['company_name'], values['role'], values['apply_link'])
+
+    field, maximum = COMPENSATION[opportunity_type]
+    values[field] = _number(record.get(field), field, maximum)
+
+    if opportunity_type == 'hackathon' and get('deadline'):
+        try:
+            values['deadline'] = datetime.strptime(get('deadline')[:10], '%Y-%m-%d')
+        except ValueError:
+            raise ValueError("deadline must be YYYY-MM-DD")
+
+    return values, _batch_names(record.get('batch_names', record.get('batches')))
+
+
+def validate_chunk(records, result):
+    """
+    Check a chunk of (row, record) pairs in one pass, rejecting bad rows
+    into result; returns (row, values, batch names) for the good ones
+    """
+    valid = []
+    for row, record in records:
+        try:
+            valid.append((row, *clean_record(record)))
+        except ValueError as e:
+            result.reject(row, str(e))
+    return valid
+
+
+def drop_duplicates(valid, seen, result):
+    """
+    Reject rows repeating an earlier row of the file (seen: {fingerprint:
+    row}) or an active job, with one lookup for the whole chunk
+    """
+    fingerprints = [values['fingerprint'] for _, values, _ in valid]
+    posted = dict(db.session.execute(
+        select(Job.fingerprint, Job.id).where(Job.fingerprint.in_(fingerprints), Job.is_active == True)
+    ).all())
+
+    unique = []
+    for row, values, batch_names in valid:
+        fingerprint = values['fingerprint']
+        if fingerprint in posted:
+            result.reject(row, f"duplicate of job #{posted[fingerprint]}")
+        elif fingerprint in seen:
+            result.reject(row, f"duplicate of row {seen[fingerprint]}")
+        else:
+            seen[fingerprint] = row
+            unique.append((values, batch_names))
+    return unique
+
+
+# ==================== WRITES ====================
+
+def resolve_batches(names, known):
+    """
+    Fill known ({name: id}) for every name, with one lookup for the unknown
+    ones and one upsert for those that don't exist yet.
+    """
+    missing = [name for name in names if name not in known]
+    if not missing:
+        return known
+    known.update(db.session.execute(select(Batch.name, Batch.id).where(Batch.name.in_(missing))).all())
+
+    new = [name for name in missing if name not in known]
+    if new:
+        # Another import or admin may have created the same batch meanwhile
+        db.session.execute(upsert(Batch).on_conflict_do_nothing(index_elements=[Batch.name]),
+                           [{'name': name} for name in new])
+        known.update(db.session.execute(select(Batch.name, Batch.id).where(Batch.name.in_(new))).all())
+    return known
+
+
+def insert_jobs(valid, known_batches):
+    """
+    Insert validated jobs and their batch links; returns {fingerprint: new
+    job id}. Jobs posted elsewhere since drop_duplicates() are skipped.
+    """
+    names = {name for _, batch_names in valid for name in batch_names}
+    resolve_batches(sorted(names), known_batches)
+
+    # Jobs sharing a set of batches go in one multi-row INSERT; which id
+    # belongs to which row then doesn't matter, so RETURNING needn't be
+    # ordered (SQLite can only order it by inserting row by row)
+    groups = {}
+    for values, batch_names in valid:
+        groups.setdefault(tuple(batch_names), []).append(values)
+
+    now = datetime.utcnow()
+    inserted = {}
+    links = []
+    for batch_names, rows in groups.items():
+        group = dict(db.session.execute(
+            upsert(Job).on_conflict_do_nothing(
+                index_elements=[Job.fingerprint], index_where=Job.is_active == True
+            ).returning(Job.fingerprint, Job.id),
+            [dict(values, created_at=now, is_active=True) for values in rows]
+        ).all())
+        inserted.update(group)
+        links.extend({'job_id': job_id, 'batch_id': known_batches[name]}
+                     for job_id in group.values() for name in batch_names)
+
+    if links:
+        db.session.execute(insert(job_batches), links)
+    sync_listing(inserted.values())
+    return inserted
+
+
+def import_jobs(stream, file_format, chunk_size=CHUNK_SIZE, notify=True):
+    """
+    Import every valid row of a CSV/NDJSON/JSON file object. Each chunk is
+    committed on its own; invalid rows are skipped and reported.
+    """
+    from flask import current_app
+    from app.signals import jobs_changed
+
+    app = current_app._get_current_object()
+    result = ImportResult()
+    known_batches = {}
+    seen = {}
+    chunk = []
+
+    def flush():
+        valid = validate_chunk(chunk, result)
+        chunk.clear()
+        if not valid:
+            return
+        valid = drop_duplicates(valid, seen, result)
+        if not valid:
+            return
+        inserted = insert_jobs(valid, known_batches)
+        db.session.commit()
+        ids = list(inserted.values())
+        jobs_changed.send(app, job_ids=ids)
+
+        result.imported += len(ids)
+        result.job_ids.extend(ids)
+        for values, batch_names in valid:
+            if values['fingerprint'] not in inserted:
+                result.reject(seen[values['fingerprint']], "duplicate of an existing job")
+                continue
+            result.batches.update(batch_names)
+            result.unbatched = result.unbatched or not batch_names
+
+    def announce():
+        if not notify or not result.job_ids:
+            return
+        from app.utils.notification_queue import enqueue_import_digest
+
+        # Jobs without batches go to everyone, so the digest does too
+        target_batches = None if result.unbatched else sorted(result.batches)
+        enqueue_import_digest(result.job_ids, target_batches, ttl=app.config.get('NOTIFICATION_TTL'))
+
+    try:
+        for row, record in read_records(stream, file_format):
+            chunk.append((row, record))
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+    except (ImportFormatError, csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        # Chunks before the error stay imported, so they are still announced
+        announce()
+        raise ImportFormatError(f"{e} ({result.imported} jobs imported before this)") from e
+
+    logger.info(f"Imported {result.imported} jobs, rejected {result.rejected} rows")
+    announce()
+    return result
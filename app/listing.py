@@ -0,0 +1,303 @@
+"""Public job listing: read model, filters, keyset pagination and cached totals.
+
+The listing reads only `job_listing`, a denormalized copy of the active
+jobs that every job write keeps current through sync_listing, in the same
+transaction. Pages are addressed by an opaque cursor holding the sort key
+values of the last (or first) row shown, so page 50 costs the same index
+range scan as page 1 instead of an ever larger OFFSET. Totals per filter
+combination are cached and dropped whenever jobs change.
+"""
+from datetime import datetime
+from sqlalchemy import or_, and_, delete, insert
+from sqlalchemy.orm import selectinload
+import base64
+import binascii
+import json
+import math
+import re
+import threading
+import time
+from app import db
+from app.cache_bus import mark_changed
+from app.models import Job, JobListing
+from app.search import search_jobs, search_terms
+from app.signals import jobs_changed
+
+PER_PAGE = 10
+JOB_TYPES = ('full_time', 'internship', 'hackathon')
+
+# Canonical location keys and the spellings that map to them
+LOCATION_ALIASES = {
+    'remote': ('remote', 'wfh', 'work from home', 'anywhere'),
+    'bangalore': ('bangalore', 'bengaluru', 'blr'),
+    'hyderabad': ('hyderabad', 'secunderabad'),
+    'pune': ('pune',),
+    'mumbai': ('mumbai', 'bombay', 'navi mumbai', 'thane'),
+    'delhi': ('delhi', 'new delhi', 'ncr', 'gurgaon', 'gurugram', 'noida'),
+    'chennai': ('chennai', 'madras'),
+    'kolkata': ('kolkata', 'calcutta'),
+}
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_LOCATION_SEPARATORS = re.compile(r'[,/|;(]')
+
+
+def location_key(text):
+    """
+    Canonical key for a free-text location: the known place mentioned first
+    ("Bengaluru / Remote" is 'bangalore'), else the first part slugified.
+    """
+    words = f" {_NON_WORD.sub(' ', (text or '').lower()).strip()} "
+    found = []
+    for key, aliases in LOCATION_ALIASES.items():
+        for alias in aliases:
+            position = words.find(f' {alias} ')
+            if position >= 0:
+                found.append((position, key))
+    if found:
+        return min(found)[1]
+    first = _LOCATION_SEPARATORS.split(text or '')[0]
+    return _NON_WORD.sub('-', first.lower()).strip('-')[:50]
+
+
+class SortKey:
+    """One column of a keyset ordering and how to read it back from a cursor"""
+
+    def __init__(self, expression, descending, load):
+        self.expression = expression
+        self.descending = descending
+        self.load = load
+
+    def order(self, reverse=False):
+        return self.expression.desc() if self.descending != reverse else self.expression.asc()
+
+    def beyond(self, value, reverse=False):
+        """Rows that sort after value (before it with reverse=True)"""
+        return self.expression < value if self.descending != reverse else self.expression > value
+
+
+# Newest first; id breaks ties between jobs created in the same instant
+NEWEST = [
+    SortKey(JobListing.created_at, True, datetime.fromisoformat),
+    SortKey(JobListing.job_id, True, int),
+]
+
+# Orderings offered by the sort menu, each backed by a job_listing index
+SORTS = {
+    'newest': NEWEST,
+    'company': [SortKey(JobListing.company_name, False, str), SortKey(JobListing.job_id, False, int)],
+    'pay_high': [SortKey(JobListing.annual_compensation, True, int), SortKey(JobListing.job_id, True, int)],
+    'pay_low': [SortKey(JobListing.annual_compensation, False, int), SortKey(JobListing.job_id, False, int)],
+}
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    """Sort key values from a cursor token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [key.load(value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def _seek(keys, values, reverse=False):
+    """Keyset condition: (k1, k2, ...) strictly past values in the given direction"""
+    clauses = []
+    for i, key in enumerate(keys):
+        equal = [keys[j].expression == values[j] for j in range(i)]
+        clauses.append(and_(*equal, key.beyond(values[i], reverse)))
+    return or_(*clauses)
+
+
+class JobPage:
+    """One page of a keyset-paginated listing"""
+
+    def __init__(self, items, total, page, per_page, next_cursor, prev_cursor):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page)) if self.total is not None else None
+
+
+def listing_rows(job):
+    """job_listing rows for an active job: one per batch and one for all batches"""
+    names = [batch.name for batch in job.batches]
+    row = {
+        'job_id': job.id,
+        'job_type': job.type_key,
+        'company_name': job.company_name,
+        'role': job.role,
+        'location': job.location,
+        'description': job.description,
+        'apply_link': job.apply_link,
+        'compensation': job.compensation,
+        'compensation_display': job.compensation_display,
+        'annual_compensation': job.annual_compensation,
+        'location_key': location_key(job.location),
+        'batch_names': ', '.join(names),
+        'deadline': job.deadline,
+        'created_at': job.created_at,
+    }
+    return [dict(row, batch_key=key) for key in [JobListing.ALL_BATCHES] + names]
+
+
+def sync_listing(job_ids, chunk_size=500):
+    """
+    Rewrite the listing rows of these jobs from their current state, dropping
+    deleted or inactive ones. Call after a flush and before the commit, so the
+    read model commits or rolls back with the write itself.
+    """
+    ids = sorted(set(job_ids))
+    mark_changed('jobs', ids)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        db.session.execute(delete(JobListing).where(JobListing.job_id.in_(chunk)))
+        jobs = Job.query.options(selectinload(Job.batches)).filter(Job.id.in_(chunk), Job.is_active == True).all()
+        rows = [row for job in jobs for row in listing_rows(job)]
+        if rows:
+            db.session.execute(insert(JobListing), rows)
+
+
+def rebuild_listing():
+    """Regenerate the whole read model; returns the number of jobs listed"""
+    db.session.execute(delete(JobListing))
+    ids = [job_id for (job_id,) in db.session.query(Job.id).filter(Job.is_active == True)]
+    sync_listing(ids)
+    return len(ids)
+
+
+def filtered_jobs(job_type='', batch='', search='', location='', sort=''):
+    """Listing rows matching the filters, with their keyset ordering"""
+    query = JobListing.query.filter(JobListing.batch_key == (batch or JobListing.ALL_BATCHES))
+    if job_type in JOB_TYPES:
+        query = query.filter(JobListing.job_type == job_type)
+    if location:
+        query = query.filter(JobListing.location_key == location_key(location))
+
+    query, ranking = search_jobs(query, search, JobListing.job_id)
+    if sort in SORTS:
+        return query, SORTS[sort]
+    # Unsorted: best matches first when searching, then newest first
+    keys = [SortKey(expression, descending, float) for expression, descending in ranking] + NEWEST
+    return query, keys
+
+
+def paginate_jobs(query, keys, after=None, before=None, page=1, per_page=PER_PAGE, total=None):
+    """
+    Fetch the page after the `after` cursor, or before the `before` cursor.
+    One extra row is read to know whether another page follows.
+    """
+    before_values = decode_cursor(before, keys)
+    after_values = None if before_values else decode_cursor(after, keys)
+    backwards = before_values is not None
+
+    if backwards:
+        query = query.filter(_seek(keys, before_values, reverse=True))
+    elif after_values:
+        query = query.filter(_seek(keys, after_values))
+
+    columns = [key.expression for key in keys]
+    rows = query.add_columns(*columns).order_by(*[key.order(backwards) for key in keys]).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    first = encode_cursor(rows[0][1:]) if rows else None
+    last = encode_cursor(rows[-1][1:]) if rows else None
+
+    if backwards:
+        next_cursor, prev_cursor = last, first if more else None
+    else:
+        next_cursor, prev_cursor = last if more else None, first if after_values else None
+
+    page = max(1, page) if (after_values or backwards) else 1
+    return JobPage(items, total, page, per_page, next_cursor, prev_cursor)
+
+
+def iter_jobs(query, keys, after=None, chunk_size=500):
+    """
+    Every row of a listing from the `after` cursor on, read one keyset page
+    at a time. Each page's rows are expunged once consumed, so memory stays
+    flat however many rows there are; other objects in the session stay.
+    """
+    while True:
+        page = paginate_jobs(query, keys, after=after, per_page=chunk_size)
+        yield from page.items
+        for item in page.items:
+            db.session.expunge(item)
+        if not page.has_next:
+            return
+        after = page.next_cursor
+
+
+class CountCache:
+    """Result totals per filter combination, expiring after ttl seconds"""
+
+    def __init__(self, ttl=300, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get(self, key):
+        entry = self._counts.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def set(self, key, count):
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                self._counts.clear()
+            self._counts[key] = (count, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def count_jobs(app, query, job_type='', batch='', search='', location=''):
+    """Total rows of a filtered listing, counted at most once per ttl per filter set"""
+    cache = app.extensions.get('listing_counts')
+    if cache is None:
+        cache = app.extensions['listing_counts'] = CountCache(app.config.get('LISTING_COUNT_TTL', 300))
+
+    key = (job_type, batch, location_key(location) if location else '',
+           tuple(term.lower() for term in search_terms(search)))
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).with_entities(db.func.count()).scalar()
+        cache.set(key, total)
+    return total
+
+
+@jobs_changed.connect
+def clear_counts(app, **kwargs):
+    cache = app.extensions.get('listing_counts')
+    if cache is not None:
+        cache.clear()
@@ -1,14 +1,19 @@
 from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlsplit
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
 from app import db
 
 # Association Table for Job-Batches Many-to-Many Relationship
 job_batches = db.Table(
     'job_batches',
     db.Column('job_id', db.Integer, db.ForeignKey('job.id'), primary_key=True),
-    db.Column('batch_id', db.Integer, db.ForeignKey('batch.id'), primary_key=True)
+    db.Column('batch_id', db.Integer, db.ForeignKey('batch.id'), primary_key=True),
+    # The primary key leads with job_id; the batch filter needs batch_id first
+    db.Index('ix_job_batches_batch_id', 'batch_id', 'job_id')
 )
 
 
@@ -59,9 +64,38 @@ class Job(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    # content_fingerprint() of the posting; NULL until `flask jobs dedupe` has checked it.
+    # Unique among active jobs only, so an expired posting can be posted again
+    fingerprint = db.Column(db.String(64))
+
     # Relationship with Batch
     batches = db.relationship('Batch', secondary=job_batches, backref='jobs')
 
+    # Admin dashboard orderings (newest/oldest, company) and the expiry sweep
+    __table_args__ = (
+        db.Index('ix_job_created', 'created_at', 'id'),
+        db.Index('ix_job_company', 'company_name', 'id'),
+        db.Index('ix_job_deadline', 'deadline'),
+        db.Index('ix_job_fingerprint', 'fingerprint', unique=True,
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+    )
+
+    @staticmethod
+    def content_fingerprint(company_name, role, apply_link):
+        """
+        Hash identifying a posting whatever its case and spacing, and however
+        its link is written (scheme, www., trailing slash, fragment, utm_ tags)
+        """
+        link = urlsplit((apply_link or '').strip())
+        host = link.netloc.lower().removeprefix('www.')
+        query = '&'.join(p for p in link.query.split('&') if p and not p.lower().startswith('utm_'))
+        parts = [
+            ' '.join((company_name or '').split()).casefold(),
+            ' '.join((role or '').split()).casefold(),
+            f"{host}{link.path.rstrip('/')}?{query}",
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
     @property
     def salary_display(self):
         if self.salary:
@@ -97,10 +131,195 @@ class Job(db.Model):
     def batch_names(self):
         return ', '.join([batch.name for batch in self.batches])
 
+    @property
+    def type_key(self):
+        """The job_type filter value matching this job"""
+        if self.is_hackathon:
+            return 'hackathon'
+        elif self.is_internship:
+            return 'internship'
+        else:
+            return 'full_time'
+
+    @property
+    def compensation(self):
+        """Prize, stipend or salary, whichever applies to the job type"""
+        if self.is_hackathon:
+            return self.prize_money
+        elif self.is_internship:
+            return self.stipend
+        else:
+            return self.salary
+
+    @property
+    def annual_compensation(self):
+        """
+        Compensation as whole rupees per year, comparable across job types:
+        salary is in LPA, stipend per month, prize money paid once.
+        0 when not disclosed.
+        """
+        if self.is_hackathon:
+            amount = self.prize_money or 0
+        elif self.is_internship:
+            amount = (self.stipend or 0) * 12
+        else:
+            amount = (self.salary or 0) * 100000
+        return int(amount)
+
+    @property
+    def compensation_display(self):
+        if self.is_hackathon:
+            return self.prize_display
+        elif self.is_internship:
+            return self.stipend_display
+        else:
+            return self.salary_display
+
     def __repr__(self):
         return f'<Job {self.role} at {self.company_name}>'
 
 
+class JobArchive(db.Model):
+    """
+    Jobs moved out of `job` once older than the retention window, with the
+    batch names they were posted to. Written by app.job_archive.
+    """
+    __tablename__ = 'job_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # The id the job had in `job`; SQLite may give it to a later job too
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    company_name = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(200), nullable=False)
+    location = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    apply_link = db.Column(db.String(500), nullable=False)
+
+    is_internship = db.Column(db.Boolean, default=False)
+    is_hackathon = db.Column(db.Boolean, default=False)
+
+    salary = db.Column(db.Numeric(10, 2), nullable=True)
+    stipend = db.Column(db.Numeric(10, 2), nullable=True)
+    prize_money = db.Column(db.Numeric(10, 2), nullable=True)
+    deadline = db.Column(db.DateTime, nullable=True)
+
+    # Comma-separated, as in Job.batch_names
+    batch_names = db.Column(db.String(500), nullable=False, default='')
+    created_at = db.Column(db.DateTime)
+    is_active = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<JobArchive {self.role} at {self.company_name}>'
+
+
+class JobListing(db.Model):
+    """
+    Read model behind the public listing: one row per active job for every
+    batch it is open to, plus one under ALL_BATCHES, with the display values
+    precomputed. Rewritten by app.listing.sync_listing inside each job write.
+    """
+    __tablename__ = 'job_listing'
+
+    ALL_BATCHES = '*'
+
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), primary_key=True)
+    batch_key = db.Column(db.String(50), primary_key=True)
+    # full_time, internship or hackathon, as in the job_type filter
+    job_type = db.Column(db.String(20), nullable=False)
+
+    company_name = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(200), nullable=False)
+    location = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    apply_link = db.Column(db.String(500), nullable=False)
+
+    compensation = db.Column(db.Numeric(10, 2), nullable=True)
+    compensation_display = db.Column(db.String(50), nullable=True)
+    # Job.annual_compensation; never NULL so it can key a keyset sort
+    annual_compensation = db.Column(db.Integer, nullable=False, default=0)
+    # Canonical place from app.listing.location_key, for the location filter
+    location_key = db.Column(db.String(50), nullable=False, default='')
+    # Comma-separated, as Job.batch_names
+    batch_names = db.Column(db.String(500), nullable=False, default='')
+
+    deadline = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    # Every listing filter is an equality on batch_key (and job_type or
+    # location_key) followed by the columns of one of the listing sorts
+    __table_args__ = (
+        db.Index('ix_job_listing_batch_created', 'batch_key', 'created_at', 'job_id'),
+        db.Index('ix_job_listing_batch_type_created', 'batch_key', 'job_type', 'created_at', 'job_id'),
+        db.Index('ix_job_listing_batch_location_created', 'batch_key', 'location_key', 'created_at', 'job_id'),
+        db.Index('ix_job_listing_batch_pay', 'batch_key', 'annual_compensation', 'job_id'),
+        db.Index('ix_job_listing_batch_type_pay', 'batch_key', 'job_type', 'annual_compensation', 'job_id'),
+        db.Index('ix_job_listing_batch_company', 'batch_key', 'company_name', 'job_id'),
+    )
+
+    # Fields served by /api/jobs and the column each one reads
+    API_FIELDS = {
+        'id': 'job_id',
+        'company_name': 'company_name',
+        'role': 'role',
+        'location': 'location',
+        'description': 'description',
+        'apply_link': 'apply_link',
+        'job_type': 'job_type',
+        'compensation': 'compensation',
+        'compensation_display': 'compensation_display',
+        'annual_compensation': 'annual_compensation',
+        'location_key': 'location_key',
+        'batches': 'batch_names',
+        'deadline': 'deadline',
+        'created_at': 'created_at',
+        'is_new': 'created_at',
+    }
+
+    @property
+    def id(self):
+        return self.job_id
+
+    @property
+    def is_internship(self):
+        return self.job_type == 'internship'
+
+    @property
+    def is_hackathon(self):
+        return self.job_type == 'hackathon'
+
+    @property
+    def batch_list(self):
+        return self.batch_names.split(', ') if self.batch_names else []
+
+    @property
+    def is_new(self):
+        return (datetime.utcnow() - self.created_at).days <= 7
+
+    def to_dict(self, fields=None):
+        """The named API_FIELDS (all by default); only their columns need loading"""
+        return {field: self._api_value(field) for field in (fields or self.API_FIELDS)}
+
+    def _api_value(self, field):
+        if field == 'id':
+            return self.job_id
+        if field == 'batches':
+            return self.batch_list
+        value = getattr(self, field)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    @classmethod
+    def api_columns(cls, fields):
+        return [getattr(cls, cls.API_FIELDS[field]) for field in fields]
+
+    def __repr__(self):
+        return f'<JobListing {self.job_id} in {self.batch_key}>'
+
+
 # ==================== PUSH NOTIFICATION MODEL ====================
 class PushSubscription(db.Model):
     __tablename__ = 'push_subscriptions'
@@ -109,6 +328,9 @@ class PushSubscription(db.Model):
     endpoint = db.Column(db.String(500), unique=True, nullable=False, index=True)
     batch = db.Column(db.String(10), nullable=False, index=True)
     subscription_json = db.Column(db.Text)
+    # Decoded key material: 65-byte uncompressed P-256 point and 16-byte auth secret
+    p256dh = db.Column(db.LargeBinary(65))
+    auth = db.Column(db.LargeBinary(16))
     user_agent = db.Column(db.String(200))
     ip_address = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -121,4 +343,110 @@ class PushSubscription(db.Model):
         return json.loads(self.subscription_json)
 
     def __repr__(self):
-        return f'<PushSubscription {self.batch} - {self.endpoint[:30]}...>'
\ No newline at end of file
+        return f'<PushSubscription {self.batch} - {self.endpoint[:30]}...>'
+
+
+class SubscriberCount(db.Model):
+    """Active subscriptions per batch, adjusted in the same transaction as every change"""
+    __tablename__ = 'subscriber_counts'
+
+    batch = db.Column(db.String(10), primary_key=True)
+    active = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SubscriberCount {self.batch}: {self.active}>'
+
+# ==================== NOTIFICATION OUTBOX ====================
+class NotificationJob(db.Model):
+    """A queued push fan-out, drained by `flask notifications worker`"""
+    __tablename__ = 'notification_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    payload_json = db.Column(db.Text, nullable=False)
+    target_batches_json = db.Column(db.Text)
+    headers_json = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING, index=True)
+
+    # Digest coalescing: new-job pushes for the same key are merged into one
+    # row until not_before passes, then the worker may claim it.
+    coalesce_key = db.Column(db.String(50), index=True)
+    job_ids_json = db.Column(db.Text)
+    not_before = db.Column(db.DateTime)
+
+    # Last PushSubscription.id delivered, so a reclaimed job resumes where it stopped
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    # FanoutResult.to_dict() totals across every batch of the job
+    metrics_json = db.Column(db.Text)
+
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def payload(self):
+        import json
+        return json.loads(self.payload_json)
+
+    @property
+    def target_batches(self):
+        import json
+        return json.loads(self.target_batches_json) if self.target_batches_json else None
+
+    @property
+    def headers(self):
+        import json
+        return json.loads(self.headers_json) if self.headers_json else None
+
+    @property
+    def job_ids(self):
+        import json
+        return json.loads(self.job_ids_json) if self.job_ids_json else []
+
+    @property
+    def metrics(self):
+        import json
+        return json.loads(self.metrics_json) if self.metrics_json else {}
+
+    def __repr__(self):
+        return f'<NotificationJob {self.id} {self.kind} {self.status}>'
+
+
+# ==================== CROSS-PROCESS CACHE VERSIONS ====================
+class CacheVersion(db.Model):
+    """Version of each cache topic ('jobs', 'subscribers'), bumped by app.cache_bus with every write"""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}: {self.version}>'
+
+
+class CacheChange(db.Model):
+    """Job ids changed in one version of a topic; NULL when unknown or too many to list"""
+    __tablename__ = 'cache_changes'
+
+    name = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    job_ids_json = db.Column(db.Text)
+
+    @property
+    def job_ids(self):
+        import json
+        return json.loads(self.job_ids_json) if self.job_ids_json else None
+
+    def __repr__(self):
+        return f'<CacheChange {self.name}: {self.version}>'
@@ -0,0 +1,167 @@
+"""Opt-in SQL profiling: query count, SQL time and N+1 patterns per request.
+
+With SQL_PROFILING on, every response gets a Server-Timing header and one
+JSON log line. Statements that repeat with only their parameters changed
+are reported as N+1 suspects. `query_budget` and SQL_QUERY_BUDGETS turn a
+query count into a hard limit, e.g. around a test client request:
+
+    with query_budget(5):
+        client.get('/')
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import json
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Collectors recording the current context's queries (a request, a budget, or both)
+_collectors = ContextVar('sql_collectors', default=())
+_install_lock = threading.Lock()
+_installed = []
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|%s))+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_statement(statement):
+    """The statement's shape: literals and IN lists collapsed, whitespace squeezed"""
+    statement = _LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('(?...)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.patterns = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.patterns[normalize_statement(statement)] += 1
+
+    def repeated(self, threshold):
+        """Statement shapes run at least threshold times, most frequent first"""
+        return [(pattern, n) for pattern, n in self.patterns.most_common() if n >= threshold]
+
+    def summary(self, limit=10):
+        return '\n'.join(f"{n}x {pattern[:200]}" for pattern, n in self.patterns.most_common(limit))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    started = conn.info.get('query_started')
+    if not collectors or not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    for stats in collectors:
+        stats.record(statement, seconds)
+
+
+def install():
+    """Attach the cursor listeners to every engine, once per process"""
+    with _install_lock:
+        if not _installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _installed.append(True)
+
+
+@contextmanager
+def collect_queries():
+    """Record queries run in this context (nested collectors all see them)"""
+    install()
+    stats = QueryStats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Fail with QueryBudgetExceeded if the block runs more than max_queries statements"""
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries, budget {max_queries}:\n{stats.summary()}"
+        )
+
+
+def init_app(app):
+    """Profile each request when SQL_PROFILING is set"""
+    if not app.config.get('SQL_PROFILING'):
+        return
+    install()
+
+    @app.before_request
+    def start_profile():
+        stats = QueryStats()
+        g.sql_profile = (stats, _collectors.set(_collectors.get() + (stats,)), time.perf_counter())
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        stats, token, started = profile
+        _collectors.reset(token)
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        sql_ms = stats.seconds * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={sql_ms:.1f};desc="{stats.count} queries", app;dur={duration_ms:.1f}'
+        )
+
+        repeated = stats.repeated(app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+        logger.info(json.dumps({
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats.count,
+            'sql_ms': round(sql_ms, 2),
+            'duration_ms': round(duration_ms, 2),
+            'repeated': [{'statement': pattern[:500], 'count': n} for pattern, n in repeated],
+        }))
+        for pattern, n in repeated:
+            logger.warning(f"Possible N+1 on {request.endpoint}: {n}x {pattern[:200]}")
+
+        budget = (app.config.get('SQL_QUERY_BUDGETS') or {}).get(request.endpoint)
+        if budget is not None and stats.count > budget:
+            message = f"{request.endpoint} ran {stats.count} queries, budget {budget}:\n{stats.summary()}"
+            if app.testing:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc):
+        # after_request is skipped when a view raises; don't leak the collector
+        profile = g.pop('sql_profile', None)
+        if profile is not None:
+            _collectors.reset(profile[1])
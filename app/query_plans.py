@@ -0,0 +1,124 @@
+"""EXPLAIN checks for the listing's query shapes.
+
+`flask jobs explain` builds every query index() can issue (each sort, with
+no filter, a job type or a location, with and without a batch, first and
+later pages, the count, and a search) and fails if any plan falls back to
+a full scan of the tables it reads, or stops using the index made for its
+shape.
+Postgres is checked with enable_seqscan off, so a sequential scan means no
+usable index exists rather than that the table is still small.
+"""
+from datetime import datetime
+import re
+from app import db
+from app.listing import filtered_jobs, _seek, JOB_TYPES, SORTS
+
+WATCHED_TABLES = ('job_listing', 'job', 'job_batches')
+# Index made for each (sort, filter) shape; the others only must not scan
+EXPECTED_INDEXES = {
+    ('newest', ''): 'ix_job_listing_batch_created',
+    ('newest', 'type'): 'ix_job_listing_batch_type_created',
+    ('newest', 'location'): 'ix_job_listing_batch_location_created',
+    ('company', ''): 'ix_job_listing_batch_company',
+    ('pay_high', ''): 'ix_job_listing_batch_pay',
+    ('pay_high', 'type'): 'ix_job_listing_batch_type_pay',
+    ('pay_low', ''): 'ix_job_listing_batch_pay',
+    ('pay_low', 'type'): 'ix_job_listing_batch_type_pay',
+}
+# A cursor value of the right type for each sort key loader
+_CURSOR_SAMPLES = {datetime.fromisoformat: '2000-01-01', int: '1', float: '0', str: 'm'}
+
+# "SCAN job" or "SCAN job_batches_1" (aliased); index scans read "SCAN job USING INDEX ..."
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+?)(?:_\d+)?$')
+
+
+def _filters():
+    """(shape, job_type, location) for each kind of listing filter"""
+    yield '', '', ''
+    for job_type in JOB_TYPES:
+        yield 'type', job_type, ''
+    yield 'location', '', 'remote'
+
+
+def listing_shapes():
+    """
+    (name, statement, expected index, scan allowed) for each query shape the
+    public listing produces. Counts may scan: when most rows match, reading
+    the table beats an index, and their results are cached anyway.
+    """
+    for sort in SORTS:
+        for shape, job_type, location in _filters():
+            for batch in ('', '2025'):
+                query, keys = filtered_jobs(job_type, batch, '', location, sort)
+                name = f"{sort} {job_type or location or 'all'}{' +batch' if batch else ''}"
+                index = EXPECTED_INDEXES.get((sort, shape))
+                cursor = [key.load(_CURSOR_SAMPLES[key.load]) for key in keys]
+                columns = [key.expression for key in keys]
+                order = [key.order() for key in keys]
+
+                yield f"{name} page", query.add_columns(*columns).order_by(*order).limit(11).statement, index, False
+                yield (f"{name} next page",
+                       query.filter(_seek(keys, cursor)).add_columns(*columns).order_by(*order).limit(11).statement,
+                       index, False)
+                if sort == 'newest':
+                    yield f"{name} count", query.order_by(None).with_entities(db.func.count()).statement, None, True
+
+    query, keys = filtered_jobs('', '', 'engineer')
+    columns = [key.expression for key in keys]
+    yield ('search page', query.add_columns(*columns).order_by(*[key.order() for key in keys]).limit(11).statement,
+           None, False)
+
+
+def _sql(statement, dialect):
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True, 'render_postcompile': True}))
+
+
+def _pg_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _pg_nodes(child)
+
+
+def explain(connection, statement, expected_index=None, scan_allowed=False):
+    """Plan lines for statement, and its problems: full scans of watched tables or a missing expected index"""
+    sql = _sql(statement, connection.dialect)
+
+    if connection.dialect.name == 'postgresql':
+        with connection.begin():
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()[0]['Plan']
+        nodes = list(_pg_nodes(plan))
+        lines = [f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip() for node in nodes]
+        problems = [line for node, line in zip(nodes, lines)
+                    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in WATCHED_TABLES]
+    else:
+        lines = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+        problems = []
+        for line in lines:
+            match = _SQLITE_SCAN.match(line)
+            if match and match.group(1) in WATCHED_TABLES:
+                problems.append(line)
+
+    if scan_allowed:
+        problems = []
+    if expected_index and not any(expected_index in line for line in lines):
+        problems.append(f"{expected_index} not used")
+    return lines, problems
+
+
+def analyze(connection):
+    """Refresh planner statistics for the watched tables"""
+    with connection.begin():
+        for table in WATCHED_TABLES:
+            connection.exec_driver_sql(f'ANALYZE {table}')
+
+
+def check_listing_plans():
+    """[(shape, plan lines, problems)] for every listing shape"""
+    results = []
+    with db.engine.connect() as connection:
+        analyze(connection)
+        for name, statement, expected_index, scan_allowed in listing_shapes():
+            lines, problems = explain(connection, statement, expected_index, scan_allowed)
+            results.append((name, lines, problems))
+    return results
@@ -0,0 +1,100 @@
+"""Small, rarely changing lookups shared by the public and admin pages.
+
+The batch list, job counts per opportunity type and subscriber counts per
+batch are cached per process under a version that the jobs_changed and
+subscribers_changed signals bump, with a TTL as a backstop for writes made
+by other processes.
+"""
+from collections import namedtuple
+import threading
+import time
+from app import db
+from app.models import Job, Batch, SubscriberCount
+from app.signals import jobs_changed, subscribers_changed
+
+BatchRef = namedtuple('BatchRef', 'id name')
+
+
+class VersionedCache:
+    """Named values, each reloaded when its version moves on or its TTL runs out"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._values = {}
+
+    def get(self, name, loader):
+        version = self._versions.get(name, 0)
+        cached = self._values.get(name)
+        if cached and cached[0] == version and cached[1] > time.monotonic():
+            return cached[2]
+
+        value = loader()
+        with self._lock:
+            # Don't store a value loaded before a concurrent invalidation
+            if self._versions.get(name, 0) == version:
+                self._values[name] = (version, time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, *names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+
+def _cache(app):
+    cache = app.extensions.get('reference_data')
+    if cache is None:
+        cache = app.extensions['reference_data'] = VersionedCache(app.config.get('REFERENCE_DATA_TTL', 300))
+    return cache
+
+
+def _load_batches():
+    return [BatchRef(*row) for row in db.session.query(Batch.id, Batch.name).order_by(Batch.name.desc())]
+
+
+def _load_job_counts():
+    full_time, internship, hackathon = db.session.query(
+        db.func.count(Job.id).filter(Job.is_internship == False, Job.is_hackathon == False),
+        db.func.count(Job.id).filter(Job.is_internship == True),
+        db.func.count(Job.id).filter(Job.is_hackathon == True),
+    ).filter(Job.is_active == True).one()
+    return {
+        'full_time': full_time,
+        'internship': internship,
+        'hackathon': hackathon,
+        'total': full_time + internship + hackathon,
+    }
+
+
+def _load_subscriber_counts():
+    by_batch = {batch: active for batch, active in db.session.query(
+        SubscriberCount.batch, SubscriberCount.active
+    ).filter(SubscriberCount.active > 0)}
+    return {'total': sum(by_batch.values()), 'by_batch': by_batch}
+
+
+def batches(app):
+    """All batches, newest name first, as (id, name) tuples"""
+    return _cache(app).get('batches', _load_batches)
+
+
+def job_counts(app):
+    """Active jobs per opportunity type, plus the total"""
+    return _cache(app).get('job_counts', _load_job_counts)
+
+
+def subscriber_counts(app):
+    """{'total': n, 'by_batch': {batch: n}} for active push subscriptions"""
+    return _cache(app).get('subscriber_counts', _load_subscriber_counts)
+
+
+@jobs_changed.connect
+def _jobs_changed(app, **kwargs):
+    _cache(app).invalidate('batches', 'job_counts')
+
+
+@subscribers_changed.connect
+def _subscribers_changed(app, **kwargs):
+    _cache(app).invalidate('subscriber_counts')
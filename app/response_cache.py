@@ -0,0 +1,227 @@
+"""Whole-response cache for anonymous GETs of public pages.
+
+Rendered pages are stored per normalized query string in a pluggable
+backend (in-process LRU, a shared directory, or Redis) and served with an
+ETag and Last-Modified, so repeat visitors get a 304 without a render.
+Job writes invalidate everything at once by bumping a version number that
+is part of every key; stale entries then age out by TTL or LRU.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from werkzeug.wrappers import Response
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from app.signals import jobs_changed
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-process LRU"""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def version(self):
+        return self._version
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[1] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, entry, ttl):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileSystemBackend:
+    """One pickle per entry in a directory that several processes can share"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._version_path = os.path.join(directory, 'VERSION')
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def version(self):
+        try:
+            with open(self._version_path) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self):
+        self._write(self._version_path, str(time.time_ns()).encode())
+        for name in os.listdir(self.directory):
+            if name != 'VERSION':
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if expires > time.time() else None
+
+    def set(self, key, entry, ttl):
+        self._write(self._path(key), pickle.dumps((time.time() + ttl, entry)))
+
+
+class RedisBackend:
+    """Any Redis-protocol server; needs the `redis` package"""
+
+    def __init__(self, url, prefix='nextsteps:page:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def version(self):
+        return int(self.client.get(self.prefix + 'version') or 0)
+
+    def bump(self):
+        self.client.incr(self.prefix + 'version')
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data else None
+
+    def set(self, key, entry, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(entry), ex=int(ttl))
+
+
+def create_backend(app):
+    kind = app.config.get('RESPONSE_CACHE', 'memory')
+    if kind == 'memory':
+        return MemoryBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+    if kind == 'filesystem':
+        return FileSystemBackend(app.config.get('RESPONSE_CACHE_DIR') or os.path.join(app.instance_path, 'page-cache'))
+    if kind == 'redis':
+        return RedisBackend(app.config['RESPONSE_CACHE_URL'])
+    return None
+
+
+def get_backend(app):
+    if 'response_cache' not in app.extensions:
+        app.extensions['response_cache'] = create_backend(app)
+    return app.extensions['response_cache']
+
+
+def _cacheable():
+    """Only anonymous GET/HEADs with no pending flash messages share a page"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not current_user.is_authenticated
+        and not session.get('_flashes')
+    )
+
+
+def _cache_key(version, params):
+    args = []
+    for name in params:
+        value = ' '.join(request.args.get(name, '').split())
+        if value:
+            args.append(f"{name}={value}")
+    return f"{request.endpoint}:{version}:{'&'.join(args)}"
+
+
+def _respond(entry):
+    response = Response(entry['body'], status=200, mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['last_modified']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def cached(*params):
+    """
+    Cache a view's 200 responses keyed on the named query arguments (all
+    other arguments are ignored). Responses that set cookies, flash or are
+    streamed are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = get_backend(current_app)
+            if backend is None or not _cacheable():
+                return view(*args, **kwargs)
+
+            try:
+                key = _cache_key(backend.version(), params)
+                entry = backend.get(key)
+            except Exception as e:
+                logger.error(f"Response cache read error: {e}")
+                return view(*args, **kwargs)
+
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if (response.status_code != 200 or response.is_streamed
+                        or 'Set-Cookie' in response.headers or session.get('_flashes')):
+                    return response
+
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.sha256(body).hexdigest()[:32],
+                    'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+                }
+                try:
+                    backend.set(key, entry, current_app.config.get('RESPONSE_CACHE_TTL', 300))
+                except Exception as e:
+                    logger.error(f"Response cache write error: {e}")
+
+            return _respond(entry)
+        return wrapper
+    return decorator
+
+
+@jobs_changed.connect
+def invalidate(app, remote=False, **kwargs):
+    backend = get_backend(app)
+    # Shared backends were already bumped by the process that made the change
+    if remote and not isinstance(backend, MemoryBackend):
+        return
+    if backend is not None:
+        try:
+            backend.bump()
+        except Exception as e:
+            logger.error(f"Response cache invalidation error: {e}")
@@ -1,37 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
-from app.models import Admin, Job, Batch, PushSubscription
+from app.models import Admin, Job, Batch, NotificationJob
+from app.signals import jobs_changed
+from app.listing import sync_listing, paginate_jobs, SortKey, JOB_TYPES
+from app.search import search_jobs
+from app.job_dedupe import find_duplicate
+from app.validation import validate_url, sanitize_input
+from app import reference_data
 from datetime import datetime
-import re
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer, selectinload
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+DASHBOARD_PER_PAGE = 25
+DASHBOARD_MAX_PER_PAGE = 100
 
-# ==================== HELPER FUNCTIONS ====================
+# Dashboard orderings over every job, active or not, each backed by a job index
+DASHBOARD_SORTS = {
+    'newest': [SortKey(Job.created_at, True, datetime.fromisoformat), SortKey(Job.id, True, int)],
+    'oldest': [SortKey(Job.created_at, False, datetime.fromisoformat), SortKey(Job.id, False, int)],
+    'company': [SortKey(Job.company_name, False, str), SortKey(Job.id, False, int)],
+}
 
-def validate_url(url):
-    """Validate URL format"""
-    if not url:
-        return False
-    url_pattern = re.compile(
-        r'^https?://'
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-        r'localhost|'
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-        r'(?::\d+)?'
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-    return url_pattern.match(url) is not None
-
-
-def sanitize_input(text, max_length=500):
-    """Basic input sanitization"""
-    if not text:
-        return text
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r'<[^>]+>', '', text)
-    return text[:max_length].strip()
 
+# ==================== HELPER FUNCTIONS ====================
 
 def validate_number(value, field_name, min_val=0, max_val=None):
     """Validate numeric input"""
@@ -78,6 +72,68 @@ def process_batches(batch_input, job):
             job.batches.append(batch)
 
 
+def dashboard_stats():
+    """Totals for the dashboard cards, in one aggregate query"""
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    total, active, this_month = db.session.query(
+        db.func.count(Job.id),
+        db.func.coalesce(db.func.sum(db.case((Job.is_active == True, 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((Job.created_at >= month_start, 1), else_=0)), 0),
+    ).one()
+    return {'total_jobs': total, 'active_jobs': active, 'this_month': this_month}
+
+
+def dashboard_page(stats, per_page=DASHBOARD_PER_PAGE):
+    """
+    The page of jobs asked for by the request's search, job_type, sort and
+    cursor arguments. Descriptions are left unloaded and batches are loaded
+    for the whole page in one query.
+    """
+    search = request.args.get('search', '')
+    job_type = request.args.get('job_type', '')
+
+    query = Job.query
+    if job_type == 'internship':
+        query = query.filter(Job.is_internship == True)
+    elif job_type == 'hackathon':
+        query = query.filter(Job.is_hackathon == True)
+    elif job_type == 'full_time':
+        query = query.filter(Job.is_internship == False, Job.is_hackathon == False)
+    query, _ = search_jobs(query, search)
+
+    if search.strip() or job_type in JOB_TYPES:
+        total = query.order_by(None).with_entities(db.func.count()).scalar()
+    else:
+        total = stats['total_jobs']
+
+    return paginate_jobs(
+        query.options(defer(Job.description), selectinload(Job.batches)),
+        DASHBOARD_SORTS.get(request.args.get('sort'), DASHBOARD_SORTS['newest']),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        page=request.args.get('page', 1, type=int),
+        per_page=per_page,
+        total=total
+    )
+
+
+def dashboard_job_data(job):
+    """A dashboard row as JSON"""
+    return {
+        'id': job.id,
+        'job_type': job.type_key,
+        'company_name': job.company_name,
+        'role': job.role,
+        'location': job.location,
+        'batches': [batch.name for batch in job.batches],
+        'compensation': float(job.compensation) if job.compensation is not None else None,
+        'compensation_display': job.compensation_display,
+        'deadline': job.deadline.isoformat() if job.deadline else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'is_active': job.is_active,
+    }
+
+
 # ==================== ROUTES ====================
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -120,10 +176,38 @@ def dashboard():
         flash("Unauthorized access.", "danger")
         return redirect(url_for('main.index'))
 
-    jobs = Job.query.order_by(Job.created_at.desc()).all()
-    batches = Batch.query.order_by(Batch.name.desc()).all()
+    stats = dashboard_stats()
+    jobs = dashboard_page(stats)
+    batches = reference_data.batches(current_app._get_current_object())
+
+    return render_template(
+        'admin/dashboard.html',
+        jobs=jobs,
+        batches=batches,
+        stats=stats,
+        current_search=request.args.get('search', ''),
+        current_job_type=request.args.get('job_type', ''),
+        current_sort=request.args.get('sort', '')
+    )
 
-    return render_template('admin/dashboard.html', jobs=jobs, batches=batches)
+
+@bp.route('/api/jobs')
+@login_required
+def dashboard_jobs():
+    """The dashboard's job table and stats as JSON, with the same arguments plus `limit`"""
+    if not isinstance(current_user, Admin):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    limit = request.args.get('limit', DASHBOARD_PER_PAGE, type=int)
+    stats = dashboard_stats()
+    jobs = dashboard_page(stats, per_page=max(1, min(limit, DASHBOARD_MAX_PER_PAGE)))
+    return jsonify({
+        'jobs': [dashboard_job_data(job) for job in jobs.items],
+        'total': jobs.total,
+        'next_cursor': jobs.next_cursor,
+        'prev_cursor': jobs.prev_cursor,
+        'stats': stats,
+    })
 
 
 @bp.route('/add', methods=['POST'])
@@ -150,6 +234,12 @@ def add_job():
         flash("Invalid URL format. Please use a valid http:// or https:// URL.", "danger")
         return redirect(url_for('admin.dashboard'))
 
+    fingerprint = Job.content_fingerprint(company_name, role, apply_link)
+    duplicate = find_duplicate(fingerprint)
+    if duplicate:
+        flash(f"{duplicate.role} at {duplicate.company_name} is already posted (#{duplicate.id}).", "warning")
+        return redirect(url_for('admin.dashboard'))
+
     job = Job(
         company_name=company_name,
         role=role,
@@ -157,7 +247,8 @@ def add_job():
         description=description,
         location=location,
         is_internship=(opportunity_type == 'internship'),
-        is_hackathon=(opportunity_type == 'hackathon')
+        is_hackathon=(opportunity_type == 'hackathon'),
+        fingerprint=fingerprint
     )
 
     if opportunity_type == 'full_time':
@@ -179,17 +270,25 @@ def add_job():
             except ValueError:
                 flash("Invalid deadline format.", "warning")
 
-    process_batches(batch_input, job)
-
-    db.session.add(job)
+    try:
+        process_batches(batch_input, job)
+        db.session.add(job)
+        db.session.flush()
+    except IntegrityError:
+        # Posted by someone else since the check above
+        db.session.rollback()
+        flash(f"{role} at {company_name} is already posted.", "warning")
+        return redirect(url_for('admin.dashboard'))
+    sync_listing([job.id])
     db.session.commit()
+    jobs_changed.send(current_app._get_current_object(), job_ids=[job.id])
 
     # ==================== SEND PUSH NOTIFICATIONS ====================
     try:
         from app.utils.push_notifications import notify_batch_async
         notify_batch_async(job)
         current_app.logger.info(f"Notification queued for new job: {job.company_name}")
-        flash(f'New {job.job_type} added successfully! Notifications sent.', 'success')
+        flash(f'New {job.job_type} added successfully! Notifications queued.', 'success')
     except Exception as e:
         current_app.logger.error(f"Failed to send notifications: {e}")
         flash(f'New {job.job_type} added successfully!', 'success')
@@ -205,7 +304,7 @@ def edit_job(job_id):
         return redirect(url_for('main.index'))
 
     job = Job.query.get_or_404(job_id)
-    batches = Batch.query.order_by(Batch.name.desc()).all()
+    batches = reference_data.batches(current_app._get_current_object())
 
     if request.method == 'POST':
         opportunity_type = request.form.get('opportunity_type', 'full_time')
@@ -225,6 +324,13 @@ def edit_job(job_id):
             flash("Invalid URL format.", "danger")
             return redirect(url_for('admin.edit_job', job_id=job_id))
 
+        fingerprint = Job.content_fingerprint(company_name, role, apply_link)
+        duplicate = find_duplicate(fingerprint, exclude_id=job.id)
+        if duplicate:
+            flash(f"{duplicate.role} at {duplicate.company_name} is already posted (#{duplicate.id}).", "danger")
+            return redirect(url_for('admin.edit_job', job_id=job_id))
+
+        job.fingerprint = fingerprint
         job.company_name = company_name
         job.role = role
         job.apply_link = apply_link
@@ -258,10 +364,17 @@ def edit_job(job_id):
                 except ValueError:
                     flash("Invalid deadline format.", "warning")
 
-        job.batches.clear()
-        process_batches(batch_input, job)
-
+        try:
+            job.batches.clear()
+            process_batches(batch_input, job)
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f"{role} at {company_name} is already posted.", "danger")
+            return redirect(url_for('admin.edit_job', job_id=job_id))
+        sync_listing([job.id])
         db.session.commit()
+        jobs_changed.send(current_app._get_current_object(), job_ids=[job.id])
         flash(f"{job.job_type} updated successfully!", "success")
         return redirect(url_for('admin.dashboard'))
 
@@ -278,11 +391,43 @@ def delete_job(job_id):
     job = Job.query.get_or_404(job_id)
     job_type = job.job_type
     db.session.delete(job)
+    db.session.flush()
+    sync_listing([job_id])
     db.session.commit()
+    jobs_changed.send(current_app._get_current_object(), job_ids=[job_id])
     flash(f"{job_type} deleted successfully!", "success")
     return redirect(url_for('admin.dashboard'))
 
 
+@bp.route('/import', methods=['POST'])
+@login_required
+def bulk_import():
+    if not isinstance(current_user, Admin):
+        flash("Unauthorized access.", "danger")
+        return redirect(url_for('main.index'))
+
+    from app.job_import import import_jobs, detect_format, ImportFormatError
+
+    upload = request.files.get('file')
+    file_format = detect_format(upload.filename) if upload else None
+    if not file_format:
+        flash("Please upload a .csv, .json or .ndjson file.", "danger")
+        return redirect(url_for('admin.dashboard'))
+
+    try:
+        result = import_jobs(upload.stream, file_format,
+                             chunk_size=current_app.config.get('JOB_IMPORT_CHUNK_SIZE', 1000))
+    except ImportFormatError as e:
+        flash(f"Import stopped: {e}", "danger")
+        return redirect(url_for('admin.dashboard'))
+
+    flash(f"Imported {result.imported} opportunities, skipped {result.rejected} rows.",
+          "success" if result.imported else "warning")
+    for row, message in result.errors[:5]:
+        flash(f"Row {row}: {message}", "warning")
+    return redirect(url_for('admin.dashboard'))
+
+
 # ==================== CUSTOM NOTIFICATIONS ====================
 
 @bp.route('/dashboard/notifications', methods=['GET', 'POST'])
@@ -321,7 +466,7 @@ def custom_notifications():
                 url=url
             )
 
-            flash(f'Custom notification sent successfully!', 'success')
+            flash('Custom notification queued for delivery!', 'success')
             current_app.logger.info(f"Admin sent custom notification: {title}")
 
         except Exception as e:
@@ -331,27 +476,51 @@ def custom_notifications():
         return redirect(url_for('admin.custom_notifications'))
 
     # GET request - show form
-    batches = Batch.query.order_by(Batch.name.desc()).all()
-
-    # Get subscription stats
-    total_subscribers = PushSubscription.query.filter_by(is_active=True).count()
-    batch_stats = db.session.query(
-        PushSubscription.batch,
-        db.func.count(PushSubscription.id)
-    ).filter_by(is_active=True).group_by(PushSubscription.batch).all()
-
-    stats = {
-        'total': total_subscribers,
-        'by_batch': {batch: count for batch, count in batch_stats}
-    }
+    app = current_app._get_current_object()
+    batches = reference_data.batches(app)
+
+    # Subscription stats from the maintained counters
+    stats = reference_data.subscriber_counts(app)
 
     return render_template(
         'admin/custom_notifications.html',
         batches=batches,
-        stats=stats
+        stats=stats,
+        deliveries=recent_deliveries()
     )
 
 
+def recent_deliveries(limit=20):
+    """Latest queued fan-outs with their delivery metrics, newest first"""
+    jobs = NotificationJob.query.order_by(NotificationJob.id.desc()).limit(limit).all()
+    return [{
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'title': job.payload.get('title'),
+        'target_batches': job.target_batches,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'sent': job.sent,
+        'failed': job.failed,
+        'attempts': job.attempts,
+        'last_error': job.last_error,
+        'metrics': job.metrics,
+    } for job in jobs]
+
+
+@bp.route('/api/notifications/metrics')
+@login_required
+def notification_metrics():
+    """Delivery metrics of recent fan-outs as JSON"""
+    if not isinstance(current_user, Admin):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'deliveries': recent_deliveries(max(1, min(limit, 200)))})
+
+
 @bp.route('/test-notification')
 @login_required
 def test_notification():
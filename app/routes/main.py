@@ -1,53 +1,41 @@
-from flask import Blueprint, render_template, request
-from app import db
-from app.models import Job, Batch
-from sqlalchemy import or_
+from flask import Blueprint, render_template, request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy.orm import load_only
+import json
+from app.models import JobListing
+from app.listing import filtered_jobs, paginate_jobs, count_jobs, iter_jobs
+from app.response_cache import cached
+from app import reference_data
+from app.suggest import get_index
 
 bp = Blueprint('main', __name__)
 
+API_PER_PAGE = 20
+API_MAX_PER_PAGE = 100
+
 
 @bp.route('/')
+@cached('page', 'job_type', 'batch', 'search', 'location', 'sort', 'after', 'before')
 def index():
     page = request.args.get('page', 1, type=int)
     job_type = request.args.get('job_type', '')
     batch_filter = request.args.get('batch', '')
     search = request.args.get('search', '')
+    location = request.args.get('location', '')
+    sort = request.args.get('sort', '')
 
-    # Base query - only active jobs
-    query = Job.query.filter_by(is_active=True)
-
-    # Filter by type
-    if job_type == 'full_time':
-        query = query.filter(Job.is_internship == False, Job.is_hackathon == False)
-    elif job_type == 'internship':
-        query = query.filter(Job.is_internship == True)
-    elif job_type == 'hackathon':
-        query = query.filter(Job.is_hackathon == True)
-
-    # Filter by batch
-    if batch_filter:
-        query = query.join(Job.batches).filter(Batch.name == batch_filter)
-
-    # Search in company name or role
-    if search:
-        search_term = f'%{search}%'
-        query = query.filter(
-            or_(
-                Job.company_name.ilike(search_term),
-                Job.role.ilike(search_term)
-            )
-        )
-
-    # Order by newest first
-    jobs = query.order_by(Job.created_at.desc()).paginate(
+    # Active jobs matching the filters, keyset-paginated on the chosen order
+    query, keys = filtered_jobs(job_type, batch_filter, search, location, sort)
+    jobs = paginate_jobs(
+        query, keys,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
         page=page,
-        per_page=10,
-        error_out=False
+        total=count_jobs(current_app._get_current_object(), query, job_type, batch_filter, search, location)
     )
 
-    # Get unique batches for filter (sorted descending)
-    all_batches = Batch.query.order_by(Batch.name.desc()).all()
-    batches = [batch.name for batch in all_batches]
+    # Batch filter options (sorted descending) and hero counts, cached until jobs change
+    app = current_app._get_current_object()
+    batches = [batch.name for batch in reference_data.batches(app)]
 
     return render_template(
         'index.html',
@@ -55,5 +43,70 @@ def index():
         batches=batches,
         current_batch=batch_filter,
         current_job_type=job_type,
-        current_search=search
-    )
\ No newline at end of file
+        current_search=search,
+        current_location=location,
+        current_sort=sort,
+        job_counts=reference_data.job_counts(app)
+    )
+
+
+@bp.route('/api/jobs')
+@cached('job_type', 'batch', 'search', 'location', 'sort', 'after', 'before', 'limit', 'fields', 'format')
+def api_jobs():
+    """
+    The public listing as JSON, with index()'s filters and sorts, an optional
+    `fields` subset and cursor paging. `format=ndjson` streams every
+    matching job instead, one object per line.
+    """
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in JobListing.API_FIELDS]
+    if unknown:
+        return jsonify({
+            'error': f"Unknown fields: {', '.join(unknown)}",
+            'fields': list(JobListing.API_FIELDS)
+        }), 400
+    fields = fields or list(JobListing.API_FIELDS)
+
+    job_type = request.args.get('job_type', '')
+    batch_filter = request.args.get('batch', '')
+    search = request.args.get('search', '')
+    location = request.args.get('location', '')
+
+    query, keys = filtered_jobs(job_type, batch_filter, search, location, request.args.get('sort', ''))
+    query = query.options(load_only(*JobListing.api_columns(fields)))
+
+    if request.args.get('format') == 'ndjson':
+        jobs = iter_jobs(query, keys, after=request.args.get('after'))
+        lines = (json.dumps(job.to_dict(fields)) + '\n' for job in jobs)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    limit = max(1, min(request.args.get('limit', API_PER_PAGE, type=int), API_MAX_PER_PAGE))
+    jobs = paginate_jobs(
+        query, keys,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=limit,
+        total=count_jobs(current_app._get_current_object(), query, job_type, batch_filter, search, location)
+    )
+    return jsonify({
+        'jobs': [job.to_dict(fields) for job in jobs.items],
+        'total': jobs.total,
+        'next_cursor': jobs.next_cursor,
+        'prev_cursor': jobs.prev_cursor,
+    })
+
+
+@bp.route('/api/suggest')
+def suggest():
+    """Typeahead for company names, roles and locations, served from memory"""
+    query = request.args.get('q', '')[:100]
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+
+    suggestions = get_index(current_app._get_current_object()).suggest(query, limit)
+
+    response = jsonify({
+        'query': query,
+        'suggestions': [{'text': text, 'type': field, 'jobs': jobs} for text, field, jobs in suggestions]
+    })
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.models import PushSubscription
+from app.utils.push_keys import decode_subscription_keys
+from app.utils.push_notifications import adjust_subscriber_counts
+from app.signals import subscribers_changed
 from app import db
 import json
 
@@ -39,15 +42,27 @@ def subscribe():
         if not batch or not isinstance(batch, str):
             return jsonify({'error': 'Batch missing or invalid'}), 400
 
+        try:
+            p256dh, auth = decode_subscription_keys(subscription_info)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         endpoint = subscription_info['endpoint']
 
         # Check if subscription already exists
         existing = PushSubscription.query.filter_by(endpoint=endpoint).first()
 
         if existing:
-            # Update existing subscription
+            # Update existing subscription, moving its count to the new batch
+            counts = {batch: 1}
+            if existing.is_active:
+                counts[existing.batch] = counts.get(existing.batch, 0) - 1
+            adjust_subscriber_counts(counts)
+
             existing.batch = batch
             existing.subscription_json = json.dumps(subscription_info)
+            existing.p256dh = p256dh
+            existing.auth = auth
             existing.is_active = True
             current_app.logger.info(f"Updated existing subscription for batch {batch}")
         else:
@@ -55,14 +70,18 @@ def subscribe():
             subscription = PushSubscription(
                 endpoint=endpoint,
                 subscription_json=json.dumps(subscription_info),
+                p256dh=p256dh,
+                auth=auth,
                 batch=batch,
                 user_agent=request.headers.get('User-Agent'),
                 ip_address=request.remote_addr
             )
             db.session.add(subscription)
+            adjust_subscriber_counts({batch: 1})
             current_app.logger.info(f"New subscription added for batch {batch}")
 
         db.session.commit()
+        subscribers_changed.send(current_app._get_current_object())
         return jsonify({
             'success': True,
             'message': f'Subscribed to notifications for {batch}'
@@ -89,8 +108,11 @@ def unsubscribe():
         subscription = PushSubscription.query.filter_by(endpoint=endpoint).first()
 
         if subscription:
+            if subscription.is_active:
+                adjust_subscriber_counts({subscription.batch: -1})
             subscription.is_active = False
             db.session.commit()
+            subscribers_changed.send(current_app._get_current_object())
             current_app.logger.info(f"Unsubscribed: {endpoint[:50]}")
             return jsonify({'success': True, 'message': 'Unsubscribed successfully'})
 
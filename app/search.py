@@ -0,0 +1,180 @@
+"""Full-text job search.
+
+SQLite (development) keeps an FTS5 external-content table, `job_fts`, in
+step with `job` through triggers. Postgres (production) keeps a generated
+`job.search_vector` tsvector column with a GIN index. Both are maintained
+by the database itself, so every insert, update or delete of a job,
+whether from the admin forms or a bulk statement, is searchable at once.
+Any other database, or one that has not been migrated yet, falls back to
+ILIKE. Queries over a copy of the job columns (the listing read model)
+pass the column holding the job id as the search key.
+"""
+from sqlalchemy import or_, event, inspect
+import logging
+import re
+from app import db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = ('company_name', 'role', 'location', 'description')
+# Relevance weight per column, same order as SEARCH_COLUMNS
+WEIGHTS = (10.0, 8.0, 4.0, 1.0)
+MAX_TERMS = 8
+MAX_TERM_LENGTH = 40
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(text):
+    """Split user input into plain word tokens, dropping all query syntax"""
+    return [term[:MAX_TERM_LENGTH] for term in _TERM.findall(text or '')][:MAX_TERMS]
+
+
+class LikeSearch:
+    """Fallback: substring match on every column, newest first"""
+
+    name = 'like'
+
+    def installed(self, connection):
+        return True
+
+    def install(self, connection):
+        pass
+
+    def apply(self, query, terms, key):
+        model = key.class_
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(or_(*[getattr(model, column).ilike(pattern) for column in SEARCH_COLUMNS]))
+        return query, []
+
+
+class SqliteFtsSearch:
+    """FTS5 external-content index over the job table, ranked by bm25"""
+
+    name = 'fts5'
+    DDL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS job_fts USING fts5("
+        "company_name, role, location, description, "
+        "content='job', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_ai AFTER INSERT ON job BEGIN "
+        "INSERT INTO job_fts(rowid, company_name, role, location, description) "
+        "VALUES (new.id, new.company_name, new.role, new.location, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_ad AFTER DELETE ON job BEGIN "
+        "INSERT INTO job_fts(job_fts, rowid, company_name, role, location, description) "
+        "VALUES ('delete', old.id, old.company_name, old.role, old.location, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS job_fts_au AFTER UPDATE OF company_name, role, location, description ON job BEGIN "
+        "INSERT INTO job_fts(job_fts, rowid, company_name, role, location, description) "
+        "VALUES ('delete', old.id, old.company_name, old.role, old.location, old.description); "
+        "INSERT INTO job_fts(rowid, company_name, role, location, description) "
+        "VALUES (new.id, new.company_name, new.role, new.location, new.description); END",
+        "INSERT INTO job_fts(job_fts) VALUES ('rebuild')",
+    ]
+    DROP = [
+        "DROP TRIGGER IF EXISTS job_fts_au",
+        "DROP TRIGGER IF EXISTS job_fts_ad",
+        "DROP TRIGGER IF EXISTS job_fts_ai",
+        "DROP TABLE IF EXISTS job_fts",
+    ]
+
+    def installed(self, connection):
+        return inspect(connection).has_table('job_fts')
+
+    def install(self, connection):
+        for statement in self.DDL:
+            connection.exec_driver_sql(statement)
+
+    def apply(self, query, terms, key):
+        # Each term becomes a quoted prefix query; quoting keeps FTS5 operators inert
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in WEIGHTS)
+        ranked = db.text(
+            f"SELECT rowid AS job_id, bm25(job_fts, {weights}) AS rank "
+            "FROM job_fts WHERE job_fts MATCH :match"
+        ).bindparams(match=match).columns(job_id=db.Integer, rank=db.Float).subquery('search')
+
+        query = query.join(ranked, ranked.c.job_id == key)
+        # bm25 scores are negative; lower means more relevant
+        return query, [(ranked.c.rank, False)]
+
+
+class PostgresSearch:
+    """Weighted tsvector column with a GIN index, ranked by ts_rank_cd"""
+
+    name = 'tsvector'
+    DDL = [
+        "ALTER TABLE job ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(company_name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(role, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'D')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_job_search_vector ON job USING gin (search_vector)",
+    ]
+    DROP = [
+        "DROP INDEX IF EXISTS ix_job_search_vector",
+        "ALTER TABLE job DROP COLUMN IF EXISTS search_vector",
+    ]
+
+    def installed(self, connection):
+        return any(column['name'] == 'search_vector' for column in inspect(connection).get_columns('job'))
+
+    def install(self, connection):
+        for statement in self.DDL:
+            connection.exec_driver_sql(statement)
+
+    def apply(self, query, terms, key):
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        vector = db.literal_column('job.search_vector')
+        if key.class_ is not Job:
+            # The vector only exists on job itself
+            query = query.join(Job, Job.id == key)
+        query = query.filter(vector.op('@@')(tsquery))
+        return query, [(db.func.ts_rank_cd(vector, tsquery), True)]
+
+
+BACKENDS = {
+    'sqlite': SqliteFtsSearch(),
+    'postgresql': PostgresSearch(),
+}
+_like = LikeSearch()
+_resolved = {}
+
+
+def get_backend():
+    """The search backend for the current database, checked once per engine"""
+    from flask import current_app
+
+    engine = db.engine
+    backend = _resolved.get(engine.url)
+    if backend is None:
+        backend = BACKENDS.get(engine.dialect.name, _like)
+        if current_app.config.get('SEARCH_BACKEND') == 'like':
+            backend = _like
+        else:
+            with engine.connect() as connection:
+                if not backend.installed(connection):
+                    logger.warning(f"Search index '{backend.name}' not installed, falling back to ILIKE")
+                    backend = _like
+        _resolved[engine.url] = backend
+    return backend
+
+
+def search_jobs(query, text, key=Job.id):
+    """
+    Restrict a query to jobs matching text, key being its job id column.
+    Returns the query and its ranking as (expression, descending) pairs,
+    empty when nothing is ranked.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return query, []
+    return get_backend().apply(query, terms, key)
+
+
+@event.listens_for(Job.__table__, 'after_create')
+def install_search_index(target, connection, **kw):
+    """Set up the search index for databases built with db.create_all()"""
+    backend = BACKENDS.get(connection.dialect.name)
+    if backend:
+        backend.install(connection)
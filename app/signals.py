@@ -0,0 +1,10 @@
+"""In-process signals for keeping derived data in step with the database"""
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent by the app after committing changes to jobs, with job_ids=[...]
+jobs_changed = _signals.signal('jobs-changed')
+
+# Sent after committing subscription changes that move the active counts
+subscribers_changed = _signals.signal('subscribers-changed')
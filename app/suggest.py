@@ -0,0 +1,136 @@
+"""In-memory typeahead index over company names, roles and locations.
+
+Built once per process from active jobs and patched on `jobs_changed`,
+so /api/suggest answers from a sorted list with bisect and never queries
+the database.
+"""
+from bisect import bisect_left, insort
+import logging
+import re
+import threading
+from app import db
+from app.models import Job
+from app.signals import jobs_changed
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('company', 'role', 'location')
+# Prefix matches examined per lookup before ranking, bounding worst-case latency
+MAX_CANDIDATES = 200
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    return ' '.join(_WORD.findall((text or '').lower()))
+
+
+class SuggestIndex:
+    """
+    Sorted (key, field, term) entries, one per word start of each distinct
+    term, so "eng" finds "Software Engineer" as well as "Engineering Lead".
+    Terms are reference-counted across the jobs that use them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._terms = {}
+        self._by_job = {}
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _add_term(self, field, text):
+        term = normalize(text)
+        if not term:
+            return None
+        entry = self._terms.get((field, term))
+        if entry:
+            entry[1] += 1
+        else:
+            self._terms[(field, term)] = [text.strip(), 1]
+            words = term.split(' ')
+            for i in range(len(words)):
+                insort(self._keys, (' '.join(words[i:]), field, term))
+        return field, term
+
+    def _remove_term(self, field, term):
+        entry = self._terms[(field, term)]
+        entry[1] -= 1
+        if entry[1]:
+            return
+        del self._terms[(field, term)]
+        words = term.split(' ')
+        for i in range(len(words)):
+            key = (' '.join(words[i:]), field, term)
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def _remove_job(self, job_id):
+        for field, term in self._by_job.pop(job_id, ()):
+            self._remove_term(field, term)
+
+    def update(self, rows):
+        """Index (id, company_name, role, location, is_active) rows, replacing earlier versions"""
+        with self._lock:
+            for job_id, company, role, location, is_active in rows:
+                self._remove_job(job_id)
+                if is_active:
+                    added = [self._add_term(field, text) for field, text in zip(FIELDS, (company, role, location))]
+                    self._by_job[job_id] = [term for term in added if term]
+
+    def remove(self, job_ids):
+        with self._lock:
+            for job_id in job_ids:
+                self._remove_job(job_id)
+
+    def suggest(self, prefix, limit=8):
+        """Most used terms with a word starting with prefix, as (text, field, jobs)"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            start = bisect_left(self._keys, (prefix,))
+            seen = {}
+            for key, field, term in self._keys[start:start + MAX_CANDIDATES]:
+                if not key.startswith(prefix):
+                    break
+                if (field, term) not in seen:
+                    text, count = self._terms[(field, term)]
+                    # Whole-term prefix matches rank above mid-term word matches
+                    seen[(field, term)] = (key != term, -count, term, text, field)
+
+        ranked = sorted(seen.values())[:limit]
+        return [(text, field, -count) for _, count, _, text, field in ranked]
+
+
+_COLUMNS = (Job.id, Job.company_name, Job.role, Job.location, Job.is_active)
+
+
+def get_index(app):
+    """The app's suggest index, built from active jobs on first use"""
+    index = app.extensions.get('suggest_index')
+    if index is None:
+        index = SuggestIndex()
+        index.update(db.session.query(*_COLUMNS).filter(Job.is_active == True))
+        app.extensions['suggest_index'] = index
+        logger.info(f"Built suggest index with {len(index)} terms")
+    return index
+
+
+@jobs_changed.connect
+def refresh_jobs(app, job_ids=(), **kwargs):
+    """Re-read changed jobs into an already built index; deleted ones drop out"""
+    if job_ids is None:
+        # Unknown set of jobs (changes from another process): rebuild on next use
+        app.extensions.pop('suggest_index', None)
+        return
+    index = app.extensions.get('suggest_index')
+    if index is None or not job_ids:
+        return
+    rows = db.session.query(*_COLUMNS).filter(Job.id.in_(job_ids)).all()
+    index.remove(set(job_ids) - {row.id for row in rows})
+    index.update(rows)
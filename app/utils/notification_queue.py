@@ -0,0 +1,274 @@
+"""Database-backed outbox for push notification fan-outs.
+
+Web workers only insert NotificationJob rows. `flask notifications worker`
+claims them, drains subscribers in id order and records its progress after
+every batch, so a restarted or crashed worker resumes a fan-out instead of
+dropping the rest of the audience.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from app import db
+from app.models import Job, NotificationJob
+from app.utils.push_fanout import merge_metrics
+from app.utils.push_notifications import subscriber_chunks, fan_out, digest_notification_data, push_headers
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_notification(kind, notification_data, target_batches=None, headers=None):
+    """Add a fan-out to the outbox and commit it"""
+    job = NotificationJob(
+        kind=kind,
+        payload_json=json.dumps(notification_data),
+        target_batches_json=json.dumps(target_batches) if target_batches else None,
+        headers_json=json.dumps(headers) if headers else None
+    )
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Queued {kind} notification {job.id}")
+    return job
+
+
+def _append_to_digest(digest, job, batch, topic, attempts=3):
+    """
+    Add job to a still-pending digest; False if a worker claimed it first.
+    The UPDATE only applies to the job list we read, so two jobs appended at
+    once can't overwrite each other: the loser re-reads the digest and retries.
+    """
+    for _ in range(attempts):
+        seen = digest.job_ids_json
+        job_ids = digest.job_ids + [job.id]
+        jobs = Job.query.filter(Job.id.in_(job_ids)).order_by(Job.created_at).all()
+        updated = NotificationJob.query.filter(
+            NotificationJob.id == digest.id,
+            NotificationJob.status == NotificationJob.STATUS_PENDING,
+            NotificationJob.job_ids_json == seen
+        ).update({
+            NotificationJob.job_ids_json: json.dumps(job_ids),
+            NotificationJob.payload_json: json.dumps(digest_notification_data(jobs, batch, topic)),
+        }, synchronize_session=False)
+        if updated:
+            return True
+        db.session.refresh(digest)
+        if digest.status != NotificationJob.STATUS_PENDING:
+            return False
+    return False
+
+
+def enqueue_job_digest(job, window=0, ttl=None):
+    """
+    Queue a new-job push for each of the job's batches (or everyone when it
+    has none). Jobs posted within `window` seconds of the first one are
+    merged into the same pending row and delivered as a single digest.
+    """
+    now = datetime.utcnow()
+    digests = []
+
+    for batch in [b.name for b in job.batches] or [None]:
+        key = f"jobs:{batch or '*'}"
+        topic = f"new-jobs-{batch or 'all'}"
+
+        digest = NotificationJob.query.filter(
+            NotificationJob.kind == 'digest',
+            NotificationJob.coalesce_key == key,
+            NotificationJob.status == NotificationJob.STATUS_PENDING,
+            NotificationJob.not_before > now
+        ).order_by(NotificationJob.id.desc()).first()
+
+        if digest is None or not _append_to_digest(digest, job, batch, topic):
+            digest = NotificationJob(
+                kind='digest',
+                coalesce_key=key,
+                job_ids_json=json.dumps([job.id]),
+                payload_json=json.dumps(digest_notification_data([job], batch, topic)),
+                target_batches_json=json.dumps([batch]) if batch else None,
+                headers_json=json.dumps(push_headers(topic=topic, ttl=ttl, urgency='normal')),
+                not_before=now + timedelta(seconds=window)
+            )
+            db.session.add(digest)
+        digests.append(digest)
+
+    db.session.commit()
+    logger.info(f"Queued job {job.id} into {len(digests)} digest(s)")
+    return digests
+
+
+def enqueue_import_digest(job_ids, target_batches=None, ttl=None, sample_size=10):
+    """
+    Queue one digest announcing a bulk import to the union of its batches
+    (everyone when target_batches is None), naming a sample of the jobs.
+    """
+    sample = Job.query.filter(Job.id.in_(job_ids[:sample_size])).order_by(Job.created_at).all()
+    batch = target_batches[0] if target_batches and len(target_batches) == 1 else None
+    topic = f"new-jobs-{batch or 'all'}"
+
+    digest = NotificationJob(
+        kind='digest',
+        job_ids_json=json.dumps([job.id for job in sample]),
+        payload_json=json.dumps(digest_notification_data(sample, batch, topic, total=len(job_ids))),
+        target_batches_json=json.dumps(target_batches) if target_batches else None,
+        headers_json=json.dumps(push_headers(topic=topic, ttl=ttl, urgency='normal'))
+    )
+    db.session.add(digest)
+    db.session.commit()
+    logger.info(f"Queued import digest {digest.id} for {len(job_ids)} jobs")
+    return digest
+
+
+def _claimable(lease_seconds):
+    """Due pending jobs, plus running jobs whose worker stopped renewing its lease"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=lease_seconds)
+    return or_(
+        and_(
+            NotificationJob.status == NotificationJob.STATUS_PENDING,
+            or_(NotificationJob.not_before == None, NotificationJob.not_before <= now)
+        ),
+        and_(
+            NotificationJob.status == NotificationJob.STATUS_RUNNING,
+            NotificationJob.locked_at < stale
+        )
+    )
+
+
+def claim_next_job(worker_id, lease_seconds):
+    """
+    Atomically take ownership of the oldest claimable job.
+    The conditional UPDATE is the lock, so two workers racing for the
+    same row cannot both win on either SQLite or Postgres.
+    """
+    while True:
+        candidate = db.session.query(NotificationJob.id).filter(
+            _claimable(lease_seconds)
+        ).order_by(NotificationJob.id).first()
+
+        if candidate is None:
+            db.session.commit()
+            return None
+
+        now = datetime.utcnow()
+        claimed = NotificationJob.query.filter(
+            NotificationJob.id == candidate.id,
+            _claimable(lease_seconds)
+        ).update({
+            NotificationJob.status: NotificationJob.STATUS_RUNNING,
+            NotificationJob.locked_by: worker_id,
+            NotificationJob.locked_at: now,
+            NotificationJob.started_at: db.func.coalesce(NotificationJob.started_at, now),
+            NotificationJob.attempts: NotificationJob.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if claimed:
+            return db.session.get(NotificationJob, candidate.id)
+
+
+def _record_progress(job, worker_id, values):
+    """Write progress only while we still hold the lease; False if it was lost"""
+    updated = NotificationJob.query.filter(
+        NotificationJob.id == job.id,
+        NotificationJob.locked_by == worker_id
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+    return bool(updated)
+
+
+def process_job(job, worker_id, batch_size, should_stop=lambda: False):
+    """Drain one claimed job batch by batch; returns False if it was interrupted"""
+    payload = job.payload
+    headers = job.headers
+    target_batches = job.target_batches
+    cursor, sent, failed = job.cursor, job.sent, job.failed
+    metrics = job.metrics
+
+    for subscriptions in subscriber_chunks(target_batches, batch_size, cursor):
+        if should_stop():
+            _record_progress(job, worker_id, {
+                NotificationJob.status: NotificationJob.STATUS_PENDING,
+                NotificationJob.locked_by: None,
+                NotificationJob.locked_at: None,
+            })
+            logger.info(f"Released notification {job.id} at cursor {cursor}")
+            return False
+
+        result = fan_out(subscriptions, payload, headers)
+        cursor, sent, failed = subscriptions[-1].id, sent + result.sent, failed + result.failed
+        metrics = merge_metrics(metrics, result.to_dict())
+
+        if not _record_progress(job, worker_id, {
+            NotificationJob.cursor: cursor,
+            NotificationJob.sent: sent,
+            NotificationJob.failed: failed,
+            NotificationJob.metrics_json: json.dumps(metrics),
+            NotificationJob.locked_at: datetime.utcnow(),
+        }):
+            logger.warning(f"Lost lease on notification {job.id}, stopping")
+            return False
+
+    _record_progress(job, worker_id, {
+        NotificationJob.status: NotificationJob.STATUS_DONE,
+        NotificationJob.finished_at: datetime.utcnow(),
+        NotificationJob.locked_by: None,
+    })
+    logger.info(f"Notification {job.id} done: {sent} sent, {failed} failed")
+    return True
+
+
+def _handle_failure(job, worker_id, error, max_attempts):
+    db.session.rollback()
+    status = NotificationJob.STATUS_FAILED if job.attempts >= max_attempts else NotificationJob.STATUS_PENDING
+    _record_progress(job, worker_id, {
+        NotificationJob.status: status,
+        NotificationJob.last_error: str(error)[:2000],
+        NotificationJob.locked_by: None,
+        NotificationJob.locked_at: None,
+    })
+    logger.error(f"Notification {job.id} error (attempt {job.attempts}): {error}")
+
+
+def run_worker(batch_size=500, poll_interval=2.0, lease_seconds=300, max_attempts=5, once=False):
+    """
+    Claim and drain queued notifications until stopped (or the queue is
+    empty with once=True). Returns False if push isn't configured.
+    """
+    from flask import current_app
+
+    # Every send would fail and each job would burn its attempts until marked failed
+    if not current_app.config.get('VAPID_PRIVATE_KEY'):
+        logger.error("VAPID keys not configured")
+        return False
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = []
+
+    def request_stop(signum, frame):
+        logger.info(f"Worker {worker_id} stopping after current batch")
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    logger.info(f"Notification worker {worker_id} started")
+    while not stopping:
+        job = claim_next_job(worker_id, lease_seconds)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            process_job(job, worker_id, batch_size, should_stop=lambda: bool(stopping))
+        except Exception as e:
+            _handle_failure(job, worker_id, e, max_attempts)
+
+        db.session.remove()
+
+    logger.info(f"Notification worker {worker_id} exited")
+    return True
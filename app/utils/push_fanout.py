@@ -0,0 +1,403 @@
+"""Concurrent fan-out engine for web push delivery"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from cryptography.hazmat.primitives.asymmetric import ec
+from requests.adapters import HTTPAdapter
+import http_ece
+import json
+import logging
+import math
+import random
+import requests
+import threading
+import time
+from app.utils.push_keys import load_recipient_key
+from app.utils.vapid import vapid_headers
+
+logger = logging.getLogger(__name__)
+
+# One keep-alive session per push service host (FCM, Mozilla, Apple, ...),
+# shared by every fan-out running in this process.
+_sessions = {}
+_limiters = {}
+_sessions_lock = threading.Lock()
+
+# Statuses worth another attempt; 429/503 also mean "slow down" for that host
+RETRYABLE_STATUSES = {0, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+MAX_RETRY_AFTER = 300
+
+
+def get_push_session(endpoint, pool_size=10):
+    """Return a keep-alive HTTP session for the push service behind endpoint"""
+    host = urlparse(endpoint).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+    return session
+
+
+def encrypt_payload(data, p256dh, auth):
+    """
+    RFC 8291 aes128gcm encryption of data for one subscriber. The recipient
+    key comes from the parsed-key LRU, so only the per-message ephemeral
+    key exchange and AES-GCM are paid on every send.
+    """
+    return http_ece.encrypt(
+        data,
+        private_key=ec.generate_private_key(ec.SECP256R1()),
+        dh=load_recipient_key(p256dh),
+        auth_secret=auth,
+        version='aes128gcm'
+    )
+
+
+def get_host_limiter(host, max_concurrency):
+    """Return the process-wide rate limiter for one push service host"""
+    with _sessions_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = HostLimiter(max_concurrency)
+    return limiter
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), capped"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """
+    Concurrency window for one push service host. Grows by one slot per
+    window of successes and halves on 429/503 (AIMD), and honours
+    Retry-After by closing the host until the given time.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def available(self, now):
+        return now >= self.blocked_until and self.in_flight < int(self.limit)
+
+    def acquire(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self, status, retry_after=None):
+        with self._lock:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            elif is_delivered(status):
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+
+def is_delivered(status):
+    """Push services accept a message with 201 (or 200/202 on some older ones)"""
+    return 200 <= status <= 202
+
+
+class LatencyHistogram:
+    """
+    Per-send latency counts in geometric buckets ~10% wide, so percentiles
+    stay accurate to about a tenth without keeping every sample.
+    """
+
+    GROWTH = 1.1
+
+    def __init__(self, counts=None):
+        self.counts = {int(bucket): n for bucket, n in (counts or {}).items()}
+        self.count = sum(self.counts.values())
+
+    def record(self, seconds):
+        ms = max(seconds * 1000, 0.001)
+        bucket = math.ceil(math.log(ms, self.GROWTH))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+
+    def percentile(self, pct):
+        """Upper bound (ms) of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return self.GROWTH ** bucket
+        return self.GROWTH ** max(self.counts)
+
+    def summary(self, bounds=(10, 50, 100, 250, 500, 1000, 5000)):
+        """Counts per coarse range ('<=10ms', ..., '>5000ms') for display"""
+        ranges = {f"<={bound}ms": 0 for bound in bounds}
+        ranges[f">{bounds[-1]}ms"] = 0
+        for bucket, n in self.counts.items():
+            ms = self.GROWTH ** bucket
+            label = next((f"<={bound}ms" for bound in bounds if ms <= bound), f">{bounds[-1]}ms")
+            ranges[label] += n
+        return ranges
+
+
+class FanoutResult:
+    """Outcome and delivery metrics of a single fan-out"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.expired = []
+        self.delivered_ids = []
+        self.statuses = {}
+        self.hosts = {}
+        self.latency = LatencyHistogram()
+        self.started = datetime.utcnow()
+        self.finished = None
+        self.started_at = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return self.sent + self.failed
+
+    @property
+    def rate(self):
+        """Sends per second over the whole fan-out"""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def record(self, host, status, seconds, outcome):
+        """Count one send attempt; outcome is 'sent', 'failed' or 'retried'"""
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        key = str(status) if status else 'error'
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        per_host = self.hosts.setdefault(host, {'sent': 0, 'failed': 0, 'retried': 0})
+        per_host[outcome] += 1
+        self.latency.record(seconds)
+
+    def finish(self):
+        self.finished = datetime.utcnow()
+        self.elapsed = time.monotonic() - self.started_at
+
+    def to_dict(self):
+        return {
+            'started_at': self.started.isoformat(),
+            'finished_at': self.finished.isoformat() if self.finished else None,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'expired': len(self.expired),
+            'elapsed': round(self.elapsed, 3),
+            'rate': round(self.rate, 1),
+            'p50_ms': round(self.latency.percentile(50), 1),
+            'p99_ms': round(self.latency.percentile(99), 1),
+            'statuses': self.statuses,
+            'hosts': self.hosts,
+            'latency_buckets': {str(bucket): n for bucket, n in self.latency.counts.items()},
+        }
+
+
+def _add_counts(total, part):
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _add_counts(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def merge_metrics(total, part):
+    """Fold one fan-out's to_dict() into a running total, e.g. across worker checkpoints"""
+    if not total:
+        return dict(part)
+
+    merged = dict(total)
+    for key in ('sent', 'failed', 'retried', 'expired', 'elapsed'):
+        merged[key] = total.get(key, 0) + part.get(key, 0)
+    for key in ('statuses', 'hosts', 'latency_buckets'):
+        merged[key] = json.loads(json.dumps(total.get(key, {})))
+        _add_counts(merged[key], part.get(key, {}))
+
+    merged['started_at'] = min(filter(None, [total.get('started_at'), part.get('started_at')]))
+    merged['finished_at'] = part.get('finished_at') or total.get('finished_at')
+    merged['elapsed'] = round(merged['elapsed'], 3)
+    merged['rate'] = round((merged['sent'] + merged['failed']) / merged['elapsed'], 1) if merged['elapsed'] else 0.0
+
+    histogram = LatencyHistogram(merged['latency_buckets'])
+    merged['p50_ms'] = round(histogram.percentile(50), 1)
+    merged['p99_ms'] = round(histogram.percentile(99), 1)
+    return merged
+
+
+class PushFanout:
+    """
+    Deliver one payload to many subscribers with a bounded number of
+    sends in flight. Subscriptions are consumed lazily (at most
+    buffer_size are held at once), queued per push service host and
+    dispatched only while that host's limiter has room. Throttled and
+    failed sends are re-queued with backoff up to max_retries times.
+    """
+
+    def __init__(self, vapid_private_key, vapid_claims, concurrency=50, timeout=10,
+                 host_concurrency=None, max_retries=3, retry_backoff=1.0, buffer_size=5000,
+                 on_delivered=None, flush_size=500):
+        self.vapid_private_key = vapid_private_key
+        self.vapid_claims = vapid_claims or {}
+        self.concurrency = max(1, int(concurrency))
+        self.host_concurrency = max(1, int(host_concurrency or concurrency))
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.buffer_size = max(buffer_size, self.concurrency * 2)
+        # Called on the coordinating thread with batches of delivered subscription ids
+        self.on_delivered = on_delivered
+        self.flush_size = flush_size
+
+    def _send(self, recipient, data, push_headers):
+        """
+        Encrypt and send to one subscriber; runs on a pool thread and never
+        touches the db. Returns (status, retry_after, seconds); status 0 means
+        the request never got a response.
+        """
+        started = time.monotonic()
+        status, retry_after = self._post(recipient, data, push_headers)
+        return status, retry_after, time.monotonic() - started
+
+    def _post(self, recipient, data, push_headers):
+        endpoint = recipient.endpoint
+        try:
+            headers = {'Content-Encoding': 'aes128gcm', 'TTL': '0'}
+            headers.update(push_headers)
+            headers.update(vapid_headers(endpoint, self.vapid_private_key, self.vapid_claims))
+
+            response = get_push_session(endpoint, self.host_concurrency).post(
+                endpoint,
+                data=encrypt_payload(data, recipient.p256dh, recipient.auth),
+                headers=headers,
+                timeout=self.timeout
+            )
+            if not is_delivered(response.status_code):
+                logger.error(f"WebPush error: {response.status_code} {response.reason} for {endpoint[:50]}")
+                return response.status_code, parse_retry_after(response.headers.get('Retry-After'))
+            return response.status_code, None
+
+        except Exception as e:
+            logger.error(f"Push error: {e}")
+            return 0, None
+
+    def _flush_delivered(self, result):
+        if not self.on_delivered or not result.delivered_ids:
+            return
+        try:
+            self.on_delivered(result.delivered_ids)
+        except Exception as e:
+            logger.error(f"Delivery bookkeeping error: {e}")
+        result.delivered_ids = []
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after is not None:
+            return retry_after
+        return self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def run(self, subscriptions, message_data, headers=None):
+        """
+        Send message_data to every row in subscriptions (needs endpoint,
+        p256dh and auth). headers adds Web Push delivery headers such as
+        TTL, Topic and Urgency to every request.
+        """
+        data = json.dumps(message_data).encode('utf-8')
+        headers = headers or {}
+        result = FanoutResult()
+        source = iter(subscriptions)
+        exhausted = False
+        queues = {}
+        buffered = 0
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='push') as executor:
+            while True:
+                while not exhausted and buffered < self.buffer_size:
+                    recipient = next(source, None)
+                    if recipient is None:
+                        exhausted = True
+                        break
+                    host = urlparse(recipient.endpoint).netloc
+                    queues.setdefault(host, deque()).append((0.0, 0, recipient))
+                    buffered += 1
+
+                # Hand out free slots host by host; remember when the earliest
+                # blocked host or delayed retry becomes sendable again.
+                now = time.monotonic()
+                wake_at = None
+                for host, queue in queues.items():
+                    limiter = get_host_limiter(host, self.host_concurrency)
+                    while queue and len(in_flight) < self.concurrency:
+                        not_before = max(queue[0][0], limiter.blocked_until)
+                        if not_before > now:
+                            wake_at = not_before if wake_at is None else min(wake_at, not_before)
+                            break
+                        if not limiter.available(now):
+                            break
+                        _, attempt, recipient = queue.popleft()
+                        buffered -= 1
+                        limiter.acquire()
+                        future = executor.submit(self._send, recipient, data, headers)
+                        in_flight[future] = (host, attempt, recipient)
+
+                if not in_flight:
+                    if exhausted and not buffered:
+                        break
+                    time.sleep(max(0.01, (wake_at or now + 0.05) - now))
+                    continue
+
+                timeout = max(0.0, wake_at - now) if wake_at is not None else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, attempt, recipient = in_flight.pop(future)
+                    status, retry_after, seconds = future.result()
+                    get_host_limiter(host, self.host_concurrency).release(status, retry_after)
+
+                    if is_delivered(status):
+                        result.record(host, status, seconds, 'sent')
+                        result.delivered_ids.append(recipient.id)
+                    elif status in RETRYABLE_STATUSES and attempt < self.max_retries:
+                        result.record(host, status, seconds, 'retried')
+                        not_before = time.monotonic() + self._backoff(attempt, retry_after)
+                        queues[host].append((not_before, attempt + 1, recipient))
+                        buffered += 1
+                    else:
+                        result.record(host, status, seconds, 'failed')
+                        if status in (404, 410):
+                            result.expired.append(recipient.endpoint)
+
+                if len(result.delivered_ids) >= self.flush_size:
+                    self._flush_delivered(result)
+
+        self._flush_delivered(result)
+
+        result.finish()
+        logger.info(
+            f"Fan-out finished: {result.sent} sent, {result.failed} failed, {result.retried} retries "
+            f"in {result.elapsed:.2f}s ({result.rate:.1f} sends/sec)"
+        )
+        return result
@@ -0,0 +1,40 @@
+"""Decoding and caching of subscriber (recipient) push keys"""
+from functools import lru_cache
+from cryptography.hazmat.primitives.asymmetric import ec
+import base64
+
+# Parsed recipient keys kept per process; ~50k covers repeat fan-outs to
+# the whole audience without re-parsing EC points every time.
+RECIPIENT_KEY_CACHE_SIZE = 50000
+
+
+def b64url_decode(value):
+    """Decode unpadded base64url, as browsers emit it in PushSubscription.toJSON()"""
+    if isinstance(value, str):
+        value = value.encode('ascii')
+    return base64.urlsafe_b64decode(value + b'=' * (-len(value) % 4))
+
+
+def decode_subscription_keys(subscription_info):
+    """
+    Return (p256dh, auth) as raw bytes from a browser subscription object.
+    Raises ValueError if either key is missing or malformed.
+    """
+    keys = subscription_info.get('keys') or {}
+    try:
+        p256dh = b64url_decode(keys['p256dh'])
+        auth = b64url_decode(keys['auth'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid subscription keys: {e}")
+
+    if len(p256dh) != 65 or p256dh[0] != 0x04:
+        raise ValueError("p256dh must be an uncompressed P-256 point")
+    if len(auth) != 16:
+        raise ValueError("auth secret must be 16 bytes")
+    return p256dh, auth
+
+
+@lru_cache(maxsize=RECIPIENT_KEY_CACHE_SIZE)
+def load_recipient_key(p256dh):
+    """Parse a subscriber's raw p256dh point into a public key object"""
+    return ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), bytes(p256dh))
@@ -1,41 +1,239 @@
 """Utility functions for push notifications"""
-from pywebpush import webpush, WebPushException
-import json
+from datetime import datetime
 import logging
+import re
 from app import db
-from app.models import PushSubscription
+from app.models import PushSubscription, SubscriberCount
+from app.utils.push_fanout import PushFanout
+from app.signals import subscribers_changed
+from app.cache_bus import mark_changed
+from app.db_utils import upsert
 
 logger = logging.getLogger(__name__)
 
 
-def send_push_notification(subscription_info, message_data, vapid_private_key, vapid_claims):
-    """Send a push notification to a single subscriber"""
-    try:
-        if isinstance(subscription_info, str):
-            subscription_info = json.loads(subscription_info)
-
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(message_data),
-            vapid_private_key=vapid_private_key,
-            vapid_claims=vapid_claims
+def adjust_subscriber_counts(deltas):
+    """
+    Add {batch: delta} to the active-subscriber counters in the current
+    transaction; the caller commits together with the subscription change.
+    """
+    deltas = {batch: delta for batch, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    mark_changed('subscribers')
+    for batch, delta in deltas.items():
+        statement = upsert(SubscriberCount).values(batch=batch, active=delta)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[SubscriberCount.batch],
+            set_={'active': SubscriberCount.active + statement.excluded.active}
+        ))
+
+
+def recount_subscribers():
+    """Rebuild the counters from push_subscriptions (repairs any drift)"""
+    SubscriberCount.query.delete(synchronize_session=False)
+    rows = db.session.query(
+        PushSubscription.batch, db.func.count(PushSubscription.id)
+    ).filter(PushSubscription.is_active == True).group_by(PushSubscription.batch).all()
+    db.session.add_all([SubscriberCount(batch=batch, active=count) for batch, count in rows])
+    mark_changed('subscribers')
+    db.session.commit()
+    return dict(rows)
+
+
+def deactivate_subscriptions(endpoints, chunk_size=500):
+    """
+    Mark subscriptions the push service reported as gone (404/410) inactive.
+    One UPDATE per chunk and a single commit, however many endpoints died
+    during the fan-out; `flask subscriptions prune` deletes them later.
+    """
+    endpoints = list(dict.fromkeys(endpoints))
+    deactivated = 0
+    lost = {}
+    for start in range(0, len(endpoints), chunk_size):
+        chunk = endpoints[start:start + chunk_size]
+        still_active = [
+            PushSubscription.endpoint.in_(chunk),
+            PushSubscription.is_active == True
+        ]
+        for batch, count in db.session.query(
+            PushSubscription.batch, db.func.count(PushSubscription.id)
+        ).filter(*still_active).group_by(PushSubscription.batch):
+            lost[batch] = lost.get(batch, 0) - count
+        deactivated += PushSubscription.query.filter(*still_active).update(
+            {PushSubscription.is_active: False}, synchronize_session=False
         )
-        return True
-
-    except WebPushException as e:
-        logger.error(f"WebPush error: {e}")
-        if e.response and e.response.status_code in [404, 410]:
-            endpoint = subscription_info.get('endpoint')
-            if endpoint:
-                expired = PushSubscription.query.filter_by(endpoint=endpoint).first()
-                if expired:
-                    db.session.delete(expired)
-                    db.session.commit()
-        return False
+    adjust_subscriber_counts(lost)
+    db.session.commit()
+
+    if deactivated:
+        from flask import current_app
+        subscribers_changed.send(current_app._get_current_object())
+        logger.info(f"Deactivated {deactivated} expired subscriptions")
+    return deactivated
+
+
+def mark_notified(subscription_ids, chunk_size=500):
+    """Stamp last_notified on delivered subscriptions with one UPDATE per chunk"""
+    now = datetime.utcnow()
+    for start in range(0, len(subscription_ids), chunk_size):
+        PushSubscription.query.filter(
+            PushSubscription.id.in_(subscription_ids[start:start + chunk_size])
+        ).update({PushSubscription.last_notified: now}, synchronize_session=False)
+    db.session.commit()
+
+
+def prune_inactive_subscriptions(chunk_size=1000, vacuum=False):
+    """Delete inactive subscriptions in id chunks, optionally compacting the table afterwards"""
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(PushSubscription.id).filter(
+            PushSubscription.is_active == False
+        ).order_by(PushSubscription.id).limit(chunk_size)]
+        if not ids:
+            break
+        deleted += PushSubscription.query.filter(
+            PushSubscription.id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    if vacuum:
+        # VACUUM cannot run inside a transaction on either backend
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(db.text('VACUUM ANALYZE push_subscriptions'))
+            elif conn.dialect.name == 'sqlite':
+                conn.execute(db.text('VACUUM'))
+
+    logger.info(f"Pruned {deleted} inactive subscriptions")
+    return deleted
+
+
+def fan_out(subscriptions, notification_data, headers=None):
+    """Deliver notification_data to subscriptions on the concurrent fan-out engine"""
+    from flask import current_app
 
-    except Exception as e:
-        logger.error(f"Push error: {e}")
-        return False
+    fanout = PushFanout(
+        vapid_private_key=current_app.config.get('VAPID_PRIVATE_KEY'),
+        vapid_claims=current_app.config.get('VAPID_CLAIMS'),
+        concurrency=current_app.config.get('PUSH_CONCURRENCY', 50),
+        timeout=current_app.config.get('PUSH_TIMEOUT', 10),
+        host_concurrency=current_app.config.get('PUSH_HOST_CONCURRENCY'),
+        max_retries=current_app.config.get('PUSH_MAX_RETRIES', 3),
+        on_delivered=mark_notified
+    )
+    result = fanout.run(subscriptions, notification_data, headers)
+
+    if result.expired:
+        deactivate_subscriptions(result.expired)
+
+    return result
+
+
+def subscriber_chunks(target_batches=None, chunk_size=1000, after_id=0):
+    """
+    Yield active subscribers in lists of at most chunk_size rows.
+    Keyset pagination on id plus a column projection (no ORM objects, no
+    user_agent/ip_address/timestamps) keeps memory flat for any audience size.
+    Rows without encryption keys (legacy or unparsable subscriptions) can't
+    be sent to and are skipped.
+    """
+    query = db.select(
+        PushSubscription.id,
+        PushSubscription.endpoint,
+        PushSubscription.p256dh,
+        PushSubscription.auth
+    ).where(
+        PushSubscription.is_active == True,
+        PushSubscription.p256dh.isnot(None),
+        PushSubscription.auth.isnot(None)
+    )
+    if target_batches:
+        query = query.where(PushSubscription.batch.in_(target_batches))
+
+    while True:
+        rows = db.session.execute(
+            query.where(PushSubscription.id > after_id).order_by(PushSubscription.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+def iter_subscribers(target_batches=None, chunk_size=1000):
+    """Stream active subscribers one row at a time"""
+    for chunk in subscriber_chunks(target_batches, chunk_size):
+        yield from chunk
+
+
+def job_notification_data(job):
+    """Notification payload announcing a new job"""
+    job_type = "Hackathon" if job.is_hackathon else ("Internship" if job.is_internship else "Job")
+
+    return {
+        "title": f"🎉 New {job_type}: {job.company_name}",
+        "body": f"{job.role} - {job.location}",
+        "icon": "/static/images/logo.png",
+        "url": f"/?job_id={job.id}"
+    }
+
+
+def digest_notification_data(jobs, batch=None, topic=None, total=None):
+    """
+    Notification payload for one or more new jobs posted within a coalescing
+    window. `total` is the full count when jobs is only a sample of them.
+    """
+    total = total or len(jobs)
+    if total == 1:
+        data = job_notification_data(jobs[0])
+    else:
+        companies = list(dict.fromkeys(job.company_name for job in jobs))
+        body = ', '.join(companies[:3])
+        if total > len(jobs):
+            body += " and more"
+        elif len(companies) > 3:
+            body += f" and {len(companies) - 3} more"
+
+        data = {
+            "title": f"🎉 {total} new jobs for {batch}" if batch else f"🎉 {total} new jobs",
+            "body": body,
+            "icon": "/static/images/logo.png",
+            "url": f"/?batch={batch}" if batch else "/"
+        }
+
+    if topic:
+        # Same tag as the Topic header, so a newer digest replaces the old one on screen too
+        data["tag"] = topic
+    return data
+
+
+def push_headers(topic=None, ttl=None, urgency=None):
+    """
+    Web Push delivery headers (RFC 8030). A Topic lets the push service
+    replace an undelivered message with a newer one for the same topic.
+    """
+    headers = {}
+    if topic:
+        headers['Topic'] = re.sub(r'[^A-Za-z0-9_-]', '', topic)[:32]
+    if ttl is not None:
+        headers['TTL'] = str(int(ttl))
+    if urgency:
+        headers['Urgency'] = urgency
+    return headers
+
+
+def custom_notification_data(title, message, notification_type, url):
+    """Notification payload for an admin-written message"""
+    emoji_map = {'info': '📢', 'success': '✅', 'warning': '⚠️', 'alert': '🚨'}
+    icon = emoji_map.get(notification_type, '📢')
+
+    return {
+        "title": f"{icon} {title}",
+        "body": message,
+        "icon": "/static/images/logo.png",
+        "url": url
+    }
 
 
 def notify_batch(job, app_context):
@@ -44,65 +242,34 @@ def notify_batch(job, app_context):
         try:
             from flask import current_app
 
-            vapid_private_key = current_app.config.get('VAPID_PRIVATE_KEY')
-            vapid_claims = current_app.config.get('VAPID_CLAIMS')
-
-            if not vapid_private_key:
+            if not current_app.config.get('VAPID_PRIVATE_KEY'):
                 logger.error("VAPID keys not configured")
                 return
 
             target_batches = [b.name for b in job.batches] if job.batches else []
+            subscriptions = iter_subscribers(target_batches, current_app.config.get('SUBSCRIBER_CHUNK_SIZE', 1000))
 
-            if target_batches:
-                subscriptions = PushSubscription.query.filter(
-                    PushSubscription.batch.in_(target_batches),
-                    PushSubscription.is_active == True
-                ).all()
-            else:
-                subscriptions = PushSubscription.query.filter_by(is_active=True).all()
-
-            if not subscriptions:
+            result = fan_out(subscriptions, job_notification_data(job))
+            if not result.total:
                 logger.info("No subscribers")
-                return
-
-            job_type = "Hackathon" if job.is_hackathon else ("Internship" if job.is_internship else "Job")
-
-            notification_data = {
-                "title": f"🎉 New {job_type}: {job.company_name}",
-                "body": f"{job.role} - {job.location}",
-                "icon": "/static/images/logo.png",
-                "url": f"/?job_id={job.id}"
-            }
-
-            success = 0
-            fail = 0
-
-            for sub in subscriptions:
-                try:
-                    subscription_info = json.loads(sub.subscription_json)
-                    if send_push_notification(subscription_info, notification_data, vapid_private_key, vapid_claims):
-                        success += 1
-                    else:
-                        fail += 1
-                except Exception as e:
-                    logger.error(f"Error: {e}")
-                    fail += 1
-
-            logger.info(f"Sent: {success}, Failed: {fail}")
+                return result
+            logger.info(f"Sent: {result.sent}, Failed: {result.failed}, statuses: {result.statuses}")
+            return result
 
         except Exception as e:
             logger.error(f"Notify error: {e}")
 
 
 def notify_batch_async(job):
-    """Async wrapper"""
+    """Queue new-job notifications, merged into the open digest for each of the job's batches"""
     from flask import current_app
-    from threading import Thread
+    from app.utils.notification_queue import enqueue_job_digest
 
-    app_context = current_app._get_current_object().app_context()
-    thread = Thread(target=notify_batch, args=(job, app_context))
-    thread.daemon = True
-    thread.start()
+    return enqueue_job_digest(
+        job,
+        window=current_app.config.get('NOTIFICATION_COALESCE_SECONDS', 0),
+        ttl=current_app.config.get('NOTIFICATION_TTL')
+    )
 
 
 def send_custom_notification(title, message, target_batches, notification_type, url, app_context):
@@ -111,38 +278,12 @@ def send_custom_notification(title, message, target_batches, notification_type,
         try:
             from flask import current_app
 
-            vapid_private_key = current_app.config.get('VAPID_PRIVATE_KEY')
-            vapid_claims = current_app.config.get('VAPID_CLAIMS')
-
-            if target_batches:
-                subscriptions = PushSubscription.query.filter(
-                    PushSubscription.batch.in_(target_batches),
-                    PushSubscription.is_active == True
-                ).all()
-            else:
-                subscriptions = PushSubscription.query.filter_by(is_active=True).all()
-
-            emoji_map = {'info': '📢', 'success': '✅', 'warning': '⚠️', 'alert': '🚨'}
-            icon = emoji_map.get(notification_type, '📢')
-
-            notification_data = {
-                "title": f"{icon} {title}",
-                "body": message,
-                "icon": "/static/images/logo.png",
-                "url": url
-            }
-
-            success = 0
-            for sub in subscriptions:
-                try:
-                    subscription_info = json.loads(sub.subscription_json)
-                    if send_push_notification(subscription_info, notification_data, vapid_private_key, vapid_claims):
-                        success += 1
-                except:
-                    pass
-
-            logger.info(f"Custom notification sent to {success} users")
-            return {'success': True, 'sent': success}
+            subscriptions = iter_subscribers(target_batches, current_app.config.get('SUBSCRIBER_CHUNK_SIZE', 1000))
+            notification_data = custom_notification_data(title, message, notification_type, url)
+
+            result = fan_out(subscriptions, notification_data)
+            logger.info(f"Custom notification sent to {result.sent} users")
+            return {'success': True, 'sent': result.sent, 'metrics': result.to_dict()}
 
         except Exception as e:
             logger.error(f"Custom notification error: {e}")
@@ -150,11 +291,13 @@ def send_custom_notification(title, message, target_batches, notification_type,
 
 
 def send_custom_notification_async(title, message, target_batches, notification_type, url):
-    """Async wrapper for custom notifications"""
+    """Queue a custom notification for the notification worker"""
     from flask import current_app
-    from threading import Thread
-
-    app_context = current_app._get_current_object().app_context()
-    thread = Thread(target=send_custom_notification, args=(title, message, target_batches, notification_type, url, app_context))
-    thread.daemon = True
-    thread.start()
\ No newline at end of file
+    from app.utils.notification_queue import enqueue_notification
+
+    notification_data = custom_notification_data(title, message, notification_type, url)
+    headers = push_headers(
+        ttl=current_app.config.get('NOTIFICATION_TTL'),
+        urgency='high' if notification_type == 'alert' else 'normal'
+    )
+    return enqueue_notification('custom', notification_data, target_batches, headers)
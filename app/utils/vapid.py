@@ -0,0 +1,60 @@
+"""Process-wide VAPID signing key and signed-header cache"""
+from urllib.parse import urlparse
+from py_vapid import Vapid
+import os
+import threading
+import time
+
+# pywebpush signs tokens for 12 hours; RFC 8292 allows at most 24.
+TOKEN_LIFETIME = 12 * 60 * 60
+# Re-sign this long before expiry so a slow fan-out never sends a stale token.
+REFRESH_MARGIN = 60 * 60
+
+_lock = threading.Lock()
+_keys = {}
+_headers = {}
+
+
+def load_vapid_key(private_key):
+    """Parse the VAPID private key (raw/DER string or PEM path) once per process"""
+    with _lock:
+        vapid = _keys.get(private_key)
+        if vapid is None:
+            if os.path.isfile(private_key):
+                vapid = Vapid.from_file(private_key_file=private_key)
+            else:
+                vapid = Vapid.from_string(private_key=private_key)
+            _keys[private_key] = vapid
+    return vapid
+
+
+def audience(endpoint):
+    """The `aud` claim for an endpoint: the push service origin"""
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def vapid_headers(endpoint, private_key, claims):
+    """
+    Signed VAPID Authorization header for the push service behind endpoint.
+    Only a handful of audiences exist (FCM, Mozilla, Apple, ...), so each
+    one is signed once and reused until shortly before it expires.
+    """
+    aud = audience(endpoint)
+    cache_key = (private_key, aud, claims.get('sub'))
+    now = time.time()
+
+    cached = _headers.get(cache_key)
+    if cached and cached[1] - REFRESH_MARGIN > now:
+        return cached[0]
+
+    vapid = load_vapid_key(private_key)
+    with _lock:
+        cached = _headers.get(cache_key)
+        if cached and cached[1] - REFRESH_MARGIN > now:
+            return cached[0]
+
+        exp = int(now) + TOKEN_LIFETIME
+        headers = vapid.sign(dict(claims, aud=aud, exp=exp))
+        _headers[cache_key] = (headers, exp)
+    return headers
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the push fan-out path.
+
+Starts local stand-in push services (an "FCM" and a "Mozilla" host) in a
+separate process, seeds N PushSubscription rows pointing at them in a
+throwaway SQLite database, then times notify_batch and
+send_custom_notification end to end.
+
+    python benchmarks/push_fanout.py --subscribers 5000 --latency-ms 40
+    python benchmarks/push_fanout.py --save bench_baseline.json
+    python benchmarks/push_fanout.py --baseline bench_baseline.json
+
+With --baseline the run exits non-zero when throughput drops or p99
+latency rises by more than --tolerance, so push-path regressions are
+caught without a real push service.
+"""
+import argparse
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+KEY_POOL_SIZE = 64
+PUSH_SERVICES = {'fcm': '/fcm/send', 'mozilla': '/wpush/v2'}
+
+
+# ==================== STAND-IN PUSH SERVICE ====================
+
+def make_handler(latency_ms, jitter_ms, gone_rate, throttle_rate, error_rate):
+    class PushServiceHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+
+            roll = random.random()
+            headers = {}
+            if roll < gone_rate:
+                status = 410
+            elif roll < gone_rate + throttle_rate:
+                status, headers = 429, {'Retry-After': '1'}
+            elif roll < gone_rate + throttle_rate + error_rate:
+                status = 503
+            else:
+                status = 201
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    return PushServiceHandler
+
+
+def serve_push_services(ports, options):
+    """Child process: one threaded HTTP server per emulated push service"""
+    import threading
+
+    handler = make_handler(**options)
+    servers = [ThreadingHTTPServer(('127.0.0.1', 0), handler) for _ in PUSH_SERVICES]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    ports.put([server.server_address[1] for server in servers])
+    threading.Event().wait()
+
+
+# ==================== FIXTURES ====================
+
+def b64url(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def generate_vapid_key():
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    return b64url(key.private_numbers().private_value.to_bytes(32, 'big'))
+
+
+def recipient_key_pool():
+    """A small pool of real subscriber keys; generating one per row would dominate seeding"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    pool = []
+    for _ in range(KEY_POOL_SIZE):
+        public = ec.generate_private_key(ec.SECP256R1()).public_key()
+        pool.append((
+            public.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint),
+            os.urandom(16),
+        ))
+    return pool
+
+
+def seed_subscriptions(db, count, ports, batch):
+    from app.models import PushSubscription
+
+    pool = recipient_key_pool()
+    hosts = list(zip(PUSH_SERVICES.values(), ports))
+    rows = []
+    for i in range(count):
+        path, port = hosts[i % len(hosts)]
+        p256dh, auth = pool[i % len(pool)]
+        endpoint = f'http://127.0.0.1:{port}{path}/{i}'
+        rows.append({
+            'endpoint': endpoint,
+            'batch': batch,
+            'subscription_json': json.dumps({
+                'endpoint': endpoint,
+                'keys': {'p256dh': b64url(p256dh), 'auth': b64url(auth)},
+            }),
+            'p256dh': p256dh,
+            'auth': auth,
+            'is_active': True,
+        })
+    db.session.execute(db.insert(PushSubscription), rows)
+    db.session.commit()
+
+
+def reactivate_subscriptions(db):
+    from app.models import PushSubscription
+
+    PushSubscription.query.update({PushSubscription.is_active: True})
+    db.session.commit()
+
+
+# ==================== MEASUREMENT ====================
+
+def measure(name, fn, trace_memory):
+    """Run fn once and collect wall time, CPU time, memory and fan-out metrics"""
+    if trace_memory:
+        tracemalloc.start()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+
+    metrics = fn()
+
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    report = {
+        'name': name,
+        'sent': metrics['sent'],
+        'failed': metrics['failed'],
+        'retried': metrics['retried'],
+        'wall_s': round(wall, 3),
+        'throughput': round(metrics['sent'] / wall, 1) if wall else 0.0,
+        'p50_ms': metrics['p50_ms'],
+        'p99_ms': metrics['p99_ms'],
+        'cpu_s': round(cpu, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if trace_memory:
+        report['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    return report
+
+
+def compare(reports, baseline, tolerance):
+    """Return regressions against a saved baseline run"""
+    previous = {report['name']: report for report in baseline}
+    regressions = []
+    for report in reports:
+        before = previous.get(report['name'])
+        if not before:
+            continue
+        if report['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{report['name']}: throughput {before['throughput']} -> {report['throughput']}/s")
+        if report['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{report['name']}: p99 {before['p99_ms']} -> {report['p99_ms']} ms")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=30.0, help='Mean push service response time.')
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--gone-rate', type=float, default=0.01, help='Share of sends answered 410 Gone.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share answered 429 with Retry-After: 1.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share answered 503.')
+    parser.add_argument('--concurrency', type=int, default=None, help='Override PUSH_CONCURRENCY.')
+    parser.add_argument('--trace-memory', action='store_true', help='Report tracemalloc peak (slows the run).')
+    parser.add_argument('--save', help='Write the results as JSON to this file.')
+    parser.add_argument('--baseline', help='Compare against results saved with --save.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='push-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['VAPID_PRIVATE_KEY'] = generate_vapid_key()
+    if args.concurrency:
+        os.environ['PUSH_CONCURRENCY'] = str(args.concurrency)
+        os.environ['PUSH_HOST_CONCURRENCY'] = str(args.concurrency)
+
+    ports = multiprocessing.Queue()
+    service = multiprocessing.Process(target=serve_push_services, daemon=True, args=(ports, {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'gone_rate': args.gone_rate,
+        'throttle_rate': args.throttle_rate,
+        'error_rate': args.error_rate,
+    }))
+    service.start()
+
+    from app import create_app, db
+    from app.models import Job, Batch
+    from app.utils.push_notifications import notify_batch, send_custom_notification
+
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+    app = create_app()
+    batch = '2025'
+
+    with app.app_context():
+        db.create_all()
+        seed_subscriptions(db, args.subscribers, ports.get(timeout=10), batch)
+
+        job = Job(company_name='Bench Corp', role='Software Engineer', location='Remote',
+                  description='Benchmark job', apply_link='https://example.com',
+                  batches=[Batch(name=batch)])
+        db.session.add(job)
+        db.session.commit()
+
+        reports = [
+            measure('notify_batch', lambda: notify_batch(job, app.app_context()).to_dict(), args.trace_memory),
+        ]
+        reactivate_subscriptions(db)
+        reports.append(measure('send_custom_notification', lambda: send_custom_notification(
+            'Benchmark', 'Benchmark custom notification', [batch], 'info', '/', app.app_context()
+        )['metrics'], args.trace_memory))
+
+    service.terminate()
+
+    print(f"{args.subscribers} subscribers, {args.latency_ms}ms push service latency")
+    for report in reports:
+        print('  ' + '  '.join(f"{key}={value}" for key, value in report.items()))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(reports, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,29 +3,9 @@ set -o errexit
 
 pip install -r requirements.txt
 
-python -c "
-import os
-import psycopg2
-from urllib.parse import urlparse
-
-url = urlparse(os.environ['DATABASE_URL'])
-conn = psycopg2.connect(
-    database=url.path[1:],
-    user=url.username,
-    password=url.password,
-    host=url.hostname,
-    port=url.port
-)
-cur = conn.cursor()
-try:
-    cur.execute('ALTER TABLE push_subscriptions DROP COLUMN IF EXISTS p256dh;')
-    cur.execute('ALTER TABLE push_subscriptions DROP COLUMN IF EXISTS auth;')
-    conn.commit()
-    print('Cleaned up unwanted columns')
-except Exception as e:
-    print(f'Error: {e}')
-conn.close()
-"
-
-flask db stamp head
+# Databases created before migrations were tracked get stamped at the
+# initial revision once; everything after it is applied by upgrade.
+if ! flask db current 2>/dev/null | grep -qE '^[0-9a-f]{12}'; then
+    flask db stamp d8f9e92f4adf
+fi
 flask db upgrade
\ No newline at end of file
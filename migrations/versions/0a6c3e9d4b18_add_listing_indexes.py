@@ -0,0 +1,27 @@
+"""Add a job_batches index for the batch filter (batch_id, job_id)
+
+Revision ID: 0a6c3e9d4b18
+Revises: f7d2b4a80c36
+Create Date: 2026-10-17 17:48:12.370264
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c3e9d4b18'
+down_revision = 'f7d2b4a80c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job_batches', schema=None) as batch_op:
+        batch_op.create_index('ix_job_batches_batch_id', ['batch_id', 'job_id'], unique=False)
+
+    op.execute('ANALYZE job_batches')
+
+
+def downgrade():
+    with op.batch_alter_table('job_batches', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_batches_batch_id')
@@ -0,0 +1,46 @@
+"""Add notification_jobs outbox
+
+Revision ID: 3a7c1e5b9d20
+Revises: d8f9e92f4adf
+Create Date: 2026-10-17 09:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c1e5b9d20'
+down_revision = 'd8f9e92f4adf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('payload_json', sa.Text(), nullable=False),
+    sa.Column('target_batches_json', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('cursor', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notification_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_jobs_status'))
+
+    op.drop_table('notification_jobs')
@@ -0,0 +1,96 @@
+"""Add the job_listing read model
+
+Revision ID: 4d1e8b7c2f95
+Revises: 0a6c3e9d4b18
+Create Date: 2026-10-17 19:06:41.508227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d1e8b7c2f95'
+down_revision = '0a6c3e9d4b18'
+branch_labels = None
+depends_on = None
+
+def _listing_row(job, names):
+    """Same values as app.listing.listing_rows, as of this revision"""
+    if job.is_hackathon:
+        job_type, amount, display = 'hackathon', job.prize_money, '₹{:,}'
+    elif job.is_internship:
+        job_type, amount, display = 'internship', job.stipend, '₹{:,}/month'
+    else:
+        job_type, amount, display = 'full_time', job.salary, '₹{:,} LPA'
+    return {
+        'job_id': job.id,
+        'job_type': job_type,
+        'company_name': job.company_name,
+        'role': job.role,
+        'location': job.location,
+        'description': job.description,
+        'apply_link': job.apply_link,
+        'compensation': amount,
+        'compensation_display': display.format(int(amount)) if amount else None,
+        'batch_names': ', '.join(names),
+        'deadline': job.deadline,
+        'created_at': job.created_at,
+    }
+
+
+def upgrade():
+    job_listing = op.create_table('job_listing',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('batch_key', sa.String(length=50), nullable=False),
+    sa.Column('job_type', sa.String(length=20), nullable=False),
+    sa.Column('company_name', sa.String(length=200), nullable=False),
+    sa.Column('role', sa.String(length=200), nullable=False),
+    sa.Column('location', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('apply_link', sa.String(length=500), nullable=False),
+    sa.Column('compensation', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('compensation_display', sa.String(length=50), nullable=True),
+    sa.Column('batch_names', sa.String(length=500), nullable=False),
+    sa.Column('deadline', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id', 'batch_key')
+    )
+    with op.batch_alter_table('job_listing', schema=None) as batch_op:
+        batch_op.create_index('ix_job_listing_batch_created', ['batch_key', 'created_at', 'job_id'], unique=False)
+        batch_op.create_index('ix_job_listing_batch_type_created', ['batch_key', 'job_type', 'created_at', 'job_id'], unique=False)
+
+    # Backfill every active job
+    conn = op.get_bind()
+    names = {}
+    for job_id, name in conn.execute(sa.text(
+            "SELECT job_batches.job_id, batch.name FROM job_batches "
+            "JOIN batch ON batch.id = job_batches.batch_id ORDER BY batch.name")):
+        names.setdefault(job_id, []).append(name)
+
+    job = sa.table('job',
+        sa.column('id', sa.Integer), sa.column('company_name', sa.String), sa.column('role', sa.String),
+        sa.column('location', sa.String), sa.column('description', sa.Text), sa.column('apply_link', sa.String),
+        sa.column('is_internship', sa.Boolean), sa.column('is_hackathon', sa.Boolean),
+        sa.column('salary', sa.Numeric(10, 2)), sa.column('stipend', sa.Numeric(10, 2)),
+        sa.column('prize_money', sa.Numeric(10, 2)), sa.column('deadline', sa.DateTime),
+        sa.column('created_at', sa.DateTime), sa.column('is_active', sa.Boolean))
+    rows = []
+    jobs = conn.execute(sa.select(*[column for column in job.c if column.name != 'is_active'])
+                        .where(job.c.is_active == sa.true()))
+    for row in jobs:
+        batches = names.get(row.id, [])
+        rows.extend(dict(_listing_row(row, batches), batch_key=key) for key in ['*'] + batches)
+    if rows:
+        op.bulk_insert(job_listing, rows)
+
+    op.execute('ANALYZE job_listing')
+
+
+def downgrade():
+    with op.batch_alter_table('job_listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_listing_batch_type_created')
+        batch_op.drop_index('ix_job_listing_batch_created')
+
+    op.drop_table('job_listing')
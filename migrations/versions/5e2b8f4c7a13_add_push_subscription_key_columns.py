@@ -0,0 +1,75 @@
+"""Add decoded p256dh/auth key columns to push_subscriptions
+
+Revision ID: 5e2b8f4c7a13
+Revises: 3a7c1e5b9d20
+Create Date: 2026-10-17 11:03:27.904115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import base64
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8f4c7a13'
+down_revision = '3a7c1e5b9d20'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 1000
+
+
+def _decode(value):
+    value = value.encode('ascii')
+    return base64.urlsafe_b64decode(value + b'=' * (-len(value) % 4))
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # build.sh used to drop leftovers of an older text-typed schema on every deploy
+        op.execute('ALTER TABLE push_subscriptions DROP COLUMN IF EXISTS p256dh')
+        op.execute('ALTER TABLE push_subscriptions DROP COLUMN IF EXISTS auth')
+
+    with op.batch_alter_table('push_subscriptions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('p256dh', sa.LargeBinary(length=65), nullable=True))
+        batch_op.add_column(sa.Column('auth', sa.LargeBinary(length=16), nullable=True))
+
+    subscriptions = sa.table(
+        'push_subscriptions',
+        sa.column('id', sa.Integer),
+        sa.column('subscription_json', sa.Text),
+        sa.column('p256dh', sa.LargeBinary),
+        sa.column('auth', sa.LargeBinary),
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(subscriptions.c.id, subscriptions.c.subscription_json)
+            .where(subscriptions.c.id > last_id)
+            .order_by(subscriptions.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+
+        for row in rows:
+            try:
+                keys = json.loads(row.subscription_json)['keys']
+                p256dh, auth = _decode(keys['p256dh']), _decode(keys['auth'])
+            except (TypeError, ValueError, KeyError):
+                continue
+            bind.execute(
+                subscriptions.update()
+                .where(subscriptions.c.id == row.id)
+                .values(p256dh=p256dh, auth=auth)
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('push_subscriptions', schema=None) as batch_op:
+        batch_op.drop_column('auth')
+        batch_op.drop_column('p256dh')
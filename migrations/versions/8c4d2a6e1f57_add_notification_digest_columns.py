@@ -0,0 +1,34 @@
+"""Add digest coalescing and push header columns to notification_jobs
+
+Revision ID: 8c4d2a6e1f57
+Revises: 5e2b8f4c7a13
+Create Date: 2026-10-17 13:41:09.226518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2a6e1f57'
+down_revision = '5e2b8f4c7a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('headers_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('coalesce_key', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('job_ids_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('not_before', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_notification_jobs_coalesce_key'), ['coalesce_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_jobs_coalesce_key'))
+        batch_op.drop_column('not_before')
+        batch_op.drop_column('job_ids_json')
+        batch_op.drop_column('coalesce_key')
+        batch_op.drop_column('headers_json')
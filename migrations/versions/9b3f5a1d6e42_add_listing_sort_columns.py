@@ -0,0 +1,91 @@
+"""Add annual compensation and location key to job_listing, with sort indexes
+
+Revision ID: 9b3f5a1d6e42
+Revises: 4d1e8b7c2f95
+Create Date: 2026-10-17 20:14:09.835116
+
+"""
+from alembic import op
+import re
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3f5a1d6e42'
+down_revision = '4d1e8b7c2f95'
+branch_labels = None
+depends_on = None
+
+# Rupees per year for one unit of job_listing.compensation, by job type
+ANNUAL_FACTORS = {'full_time': 100000, 'internship': 12, 'hackathon': 1}
+
+# app.listing.location_key and its aliases, as of this revision
+LOCATION_ALIASES = {
+    'remote': ('remote', 'wfh', 'work from home', 'anywhere'),
+    'bangalore': ('bangalore', 'bengaluru', 'blr'),
+    'hyderabad': ('hyderabad', 'secunderabad'),
+    'pune': ('pune',),
+    'mumbai': ('mumbai', 'bombay', 'navi mumbai', 'thane'),
+    'delhi': ('delhi', 'new delhi', 'ncr', 'gurgaon', 'gurugram', 'noida'),
+    'chennai': ('chennai', 'madras'),
+    'kolkata': ('kolkata', 'calcutta'),
+}
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_LOCATION_SEPARATORS = re.compile(r'[,/|;(]')
+
+
+def location_key(text):
+    words = f" {_NON_WORD.sub(' ', (text or '').lower()).strip()} "
+    found = []
+    for key, aliases in LOCATION_ALIASES.items():
+        for alias in aliases:
+            position = words.find(f' {alias} ')
+            if position >= 0:
+                found.append((position, key))
+    if found:
+        return min(found)[1]
+    first = _LOCATION_SEPARATORS.split(text or '')[0]
+    return _NON_WORD.sub('-', first.lower()).strip('-')[:50]
+
+
+def upgrade():
+    with op.batch_alter_table('job_listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('annual_compensation', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('location_key', sa.String(length=50), nullable=False, server_default=''))
+
+    # Backfill from the values already copied into the read model
+    conn = op.get_bind()
+    listing = sa.table('job_listing',
+        sa.column('job_id', sa.Integer), sa.column('job_type', sa.String), sa.column('location', sa.String),
+        sa.column('compensation', sa.Numeric(10, 2)), sa.column('annual_compensation', sa.Integer),
+        sa.column('location_key', sa.String))
+    rows = conn.execute(sa.select(listing.c.job_id, listing.c.job_type, listing.c.location, listing.c.compensation)
+                        .distinct()).all()
+    if rows:
+        conn.execute(
+            listing.update().where(listing.c.job_id == sa.bindparam('id')).values(
+                annual_compensation=sa.bindparam('annual'), location_key=sa.bindparam('key')),
+            [{
+                'id': row.job_id,
+                'annual': int((row.compensation or 0) * ANNUAL_FACTORS.get(row.job_type, 1)),
+                'key': location_key(row.location),
+            } for row in rows]
+        )
+
+    with op.batch_alter_table('job_listing', schema=None) as batch_op:
+        batch_op.create_index('ix_job_listing_batch_location_created', ['batch_key', 'location_key', 'created_at', 'job_id'], unique=False)
+        batch_op.create_index('ix_job_listing_batch_pay', ['batch_key', 'annual_compensation', 'job_id'], unique=False)
+        batch_op.create_index('ix_job_listing_batch_type_pay', ['batch_key', 'job_type', 'annual_compensation', 'job_id'], unique=False)
+        batch_op.create_index('ix_job_listing_batch_company', ['batch_key', 'company_name', 'job_id'], unique=False)
+
+    op.execute('ANALYZE job_listing')
+
+
+def downgrade():
+    with op.batch_alter_table('job_listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_listing_batch_company')
+        batch_op.drop_index('ix_job_listing_batch_type_pay')
+        batch_op.drop_index('ix_job_listing_batch_pay')
+        batch_op.drop_index('ix_job_listing_batch_location_created')
+        batch_op.drop_column('location_key')
+        batch_op.drop_column('annual_compensation')
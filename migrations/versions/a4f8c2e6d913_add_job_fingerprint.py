@@ -0,0 +1,67 @@
+"""Add a content fingerprint to job, unique among active jobs
+
+Revision ID: a4f8c2e6d913
+Revises: e7b2d94c1a58
+Create Date: 2026-10-17 22:31:52.617040
+
+"""
+from alembic import op
+from urllib.parse import urlsplit
+import hashlib
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f8c2e6d913'
+down_revision = 'e7b2d94c1a58'
+branch_labels = None
+depends_on = None
+
+
+def _fingerprint(company_name, role, apply_link):
+    """Same value as Job.content_fingerprint, as of this revision"""
+    link = urlsplit((apply_link or '').strip())
+    host = link.netloc.lower().removeprefix('www.')
+    query = '&'.join(p for p in link.query.split('&') if p and not p.lower().startswith('utm_'))
+    parts = [
+        ' '.join((company_name or '').split()).casefold(),
+        ' '.join((role or '').split()).casefold(),
+        f"{host}{link.path.rstrip('/')}?{query}",
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(length=64), nullable=True))
+
+    # Fingerprint one job per posting (active first, then oldest); the other
+    # copies stay NULL until `flask jobs dedupe` merges them into it
+    conn = op.get_bind()
+    job = sa.table('job',
+        sa.column('id', sa.Integer), sa.column('company_name', sa.String), sa.column('role', sa.String),
+        sa.column('apply_link', sa.String), sa.column('is_active', sa.Boolean), sa.column('fingerprint', sa.String))
+    seen = set()
+    rows = []
+    for row in conn.execute(sa.select(job.c.id, job.c.company_name, job.c.role, job.c.apply_link)
+                            .order_by(job.c.is_active.desc(), job.c.id)):
+        fingerprint = _fingerprint(row.company_name, row.role, row.apply_link)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            rows.append({'job_id': row.id, 'value': fingerprint})
+    if rows:
+        conn.execute(job.update().where(job.c.id == sa.bindparam('job_id')).values(fingerprint=sa.bindparam('value')), rows)
+
+    # Unique among active jobs only, so an expired posting can be posted again
+    active = sa.column('is_active', sa.Boolean) == sa.true()
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_fingerprint'), ['fingerprint'], unique=True,
+                              sqlite_where=active, postgresql_where=active)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_fingerprint'))
+
+    # Plain ALTER TABLE: a batch-mode copy of job would drop the job_fts triggers
+    op.drop_column('job', 'fingerprint')
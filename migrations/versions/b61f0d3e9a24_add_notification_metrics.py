@@ -0,0 +1,26 @@
+"""Add delivery metrics to notification_jobs
+
+Revision ID: b61f0d3e9a24
+Revises: 8c4d2a6e1f57
+Create Date: 2026-10-17 15:02:47.518330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61f0d3e9a24'
+down_revision = '8c4d2a6e1f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('metrics_json', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('notification_jobs', schema=None) as batch_op:
+        batch_op.drop_column('metrics_json')
@@ -0,0 +1,36 @@
+"""Add cache_versions and cache_changes for cross-worker invalidation
+
+Revision ID: b9d3e1f7c264
+Revises: a4f8c2e6d913
+Create Date: 2026-10-17 23:15:06.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d3e1f7c264'
+down_revision = 'a4f8c2e6d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('cache_changes',
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('job_ids_json', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('name', 'version')
+    )
+    op.bulk_insert(cache_versions, [{'name': 'jobs', 'version': 0}, {'name': 'subscribers', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_changes')
+    op.drop_table('cache_versions')
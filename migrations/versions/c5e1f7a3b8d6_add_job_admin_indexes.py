@@ -0,0 +1,27 @@
+"""Add job indexes for the paginated admin dashboard
+
+Revision ID: c5e1f7a3b8d6
+Revises: 9b3f5a1d6e42
+Create Date: 2026-10-17 21:02:37.264815
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1f7a3b8d6'
+down_revision = '9b3f5a1d6e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_created', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_job_company', ['company_name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_company')
+        batch_op.drop_index('ix_job_created')
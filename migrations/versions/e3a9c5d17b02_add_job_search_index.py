@@ -0,0 +1,75 @@
+"""Add full-text search index on job
+
+Revision ID: e3a9c5d17b02
+Revises: b61f0d3e9a24
+Create Date: 2026-10-17 16:20:33.804129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c5d17b02'
+down_revision = 'b61f0d3e9a24'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS job_fts USING fts5("
+    "company_name, role, location, description, "
+    "content='job', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_ai AFTER INSERT ON job BEGIN "
+    "INSERT INTO job_fts(rowid, company_name, role, location, description) "
+    "VALUES (new.id, new.company_name, new.role, new.location, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_ad AFTER DELETE ON job BEGIN "
+    "INSERT INTO job_fts(job_fts, rowid, company_name, role, location, description) "
+    "VALUES ('delete', old.id, old.company_name, old.role, old.location, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS job_fts_au AFTER UPDATE OF company_name, role, location, description ON job BEGIN "
+    "INSERT INTO job_fts(job_fts, rowid, company_name, role, location, description) "
+    "VALUES ('delete', old.id, old.company_name, old.role, old.location, old.description); "
+    "INSERT INTO job_fts(rowid, company_name, role, location, description) "
+    "VALUES (new.id, new.company_name, new.role, new.location, new.description); END",
+    "INSERT INTO job_fts(job_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS job_fts_au",
+    "DROP TRIGGER IF EXISTS job_fts_ad",
+    "DROP TRIGGER IF EXISTS job_fts_ai",
+    "DROP TABLE IF EXISTS job_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(company_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(role, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'D')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_job_search_vector ON job USING gin (search_vector)",
+]
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_job_search_vector",
+    "ALTER TABLE job DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
@@ -0,0 +1,57 @@
+"""Add job_archive for jobs past the retention window
+
+Revision ID: e7b2d94c1a58
+Revises: c5e1f7a3b8d6
+Create Date: 2026-10-17 21:48:15.903362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d94c1a58'
+down_revision = 'c5e1f7a3b8d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('company_name', sa.String(length=200), nullable=False),
+    sa.Column('role', sa.String(length=200), nullable=False),
+    sa.Column('location', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('apply_link', sa.String(length=500), nullable=False),
+    sa.Column('is_internship', sa.Boolean(), nullable=True),
+    sa.Column('is_hackathon', sa.Boolean(), nullable=True),
+    sa.Column('salary', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('stipend', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('prize_money', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('deadline', sa.DateTime(), nullable=True),
+    sa.Column('batch_names', sa.String(length=500), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_archive_archived_at'), ['archived_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_job_archive_job_id'), ['job_id'], unique=False)
+
+    # The sweeper looks up hackathons past their deadline
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_deadline', ['deadline'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_deadline')
+
+    with op.batch_alter_table('job_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_archive_job_id'))
+        batch_op.drop_index(batch_op.f('ix_job_archive_archived_at'))
+
+    op.drop_table('job_archive')
@@ -0,0 +1,37 @@
+"""Add subscriber_counts counter table
+
+Revision ID: f7d2b4a80c36
+Revises: e3a9c5d17b02
+Create Date: 2026-10-17 17:05:51.632904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7d2b4a80c36'
+down_revision = 'e3a9c5d17b02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('subscriber_counts',
+    sa.Column('batch', sa.String(length=10), nullable=False),
+    sa.Column('active', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('batch')
+    )
+
+    # Databases built by the initial migration name the column batch_name
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('push_subscriptions')}
+    batch_column = 'batch' if 'batch' in columns else 'batch_name'
+    op.execute(sa.text(
+        f"INSERT INTO subscriber_counts (batch, active) "
+        f"SELECT {batch_column}, COUNT(*) FROM push_subscriptions "
+        f"WHERE is_active = :active GROUP BY {batch_column}"
+    ).bindparams(active=True))
+
+
+def downgrade():
+    op.drop_table('subscriber_counts')
@@ -12,17 +12,47 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
 
-        // Search with debounce
+        // Typeahead: fetch suggestions as the user types, submit only on Enter/selection
         const searchInput = filterForm.querySelector('input[name="search"]');
         if (searchInput) {
-            let searchTimeout;
-            searchInput.addEventListener('input', function() {
-                clearTimeout(searchTimeout);
-                searchTimeout = setTimeout(() => {
-                    if (this.value.length >= 3 || this.value.length === 0) {
-                        filterForm.submit();
-                    }
-                }, 500);
+            const suggestions = document.createElement('datalist');
+            suggestions.id = 'search-suggestions';
+            searchInput.after(suggestions);
+            searchInput.setAttribute('list', suggestions.id);
+
+            let suggestTimeout;
+            let pending;
+            searchInput.addEventListener('input', function(event) {
+                clearTimeout(suggestTimeout);
+
+                // Picking an option from the list fires input without inputType
+                if (!event.inputType && [...suggestions.options].some(o => o.value === this.value)) {
+                    filterForm.submit();
+                    return;
+                }
+
+                const query = this.value.trim();
+                if (!query) {
+                    suggestions.replaceChildren();
+                    return;
+                }
+
+                suggestTimeout = setTimeout(() => {
+                    if (pending) pending.abort();
+                    pending = new AbortController();
+
+                    fetch(`/api/suggest?q=${encodeURIComponent(query)}`, { signal: pending.signal })
+                        .then(response => response.ok ? response.json() : { suggestions: [] })
+                        .then(data => {
+                            suggestions.replaceChildren(...data.suggestions.map(item => {
+                                const option = document.createElement('option');
+                                option.value = item.text;
+                                option.label = item.type;
+                                return option;
+                            }));
+                        })
+                        .catch(() => {});
+                }, 80);
             });
         }
     }